@@ -1,8 +1,14 @@
-from playwright.sync_api import sync_playwright
 import re
 import random
 import time
 import json
+from browser_session import BrowserSession
+from enrichment import plan_enrichment
+from listing_cache import ListingCache
+from price_history import PriceHistory
+from result_store import ResultStore
+
+SITE = "Amazon"
 
 # List of user agents to rotate
 USER_AGENTS = [
@@ -87,21 +93,26 @@ def extract_specs_from_name(name):
 
     return specs
 
-def extract_specs_from_page(page, product_name, retries=2):
-    """Extract structured specs from the product page with retries."""
+def extract_specs_from_page(page, product_name, retries=2, session=None):
+    """Extract structured specs from the product page with retries.
+
+    A BrowserSession, when given, supplies the timeouts and retry pauses.
+    """
     specs = extract_specs_from_name(product_name)  # Start with specs from name
+    timeout = session.timeout if session else (lambda milliseconds: milliseconds)
+    pause = session.pause if session else (lambda low, high: time.sleep(random.uniform(low, high)))
 
     for attempt in range(retries + 1):
         try:
             # Wait for DOM content to load
-            page.wait_for_load_state("domcontentloaded", timeout=60000)
+            page.wait_for_load_state("domcontentloaded", timeout=timeout(60000))
 
             # Wait for the product details section to load
             selectors = ["#prodDetails", "#feature-bullets"]
             spec_container = None
             for selector in selectors:
                 try:
-                    page.wait_for_selector(selector, timeout=20000, state="visible")
+                    page.wait_for_selector(selector, timeout=timeout(20000), state="visible")
                     spec_container = page.query_selector(selector)
                     if spec_container:
                         print(f"Found container using selector: {selector}")
@@ -117,7 +128,7 @@ def extract_specs_from_page(page, product_name, retries=2):
             # Extract from #prodDetails
             if spec_container.get_attribute("id") == "prodDetails":
                 try:
-                    page.wait_for_selector("#productDetails_techSpec_section_1", timeout=10000, state="visible")
+                    page.wait_for_selector("#productDetails_techSpec_section_1", timeout=timeout(10000), state="visible")
                     spec_table = spec_container.query_selector("#productDetails_techSpec_section_1")
                     if spec_table:
                         print("Found technical details table: #productDetails_techSpec_section_1")
@@ -214,7 +225,7 @@ def extract_specs_from_page(page, product_name, retries=2):
             print(f"Attempt {attempt + 1} failed for {page.url}: {e}")
             if attempt < retries:
                 print(f"Retrying... ({attempt + 1}/{retries})")
-                time.sleep(random.uniform(2, 5))
+                pause(2, 5)
                 page.reload()
                 continue
             else:
@@ -223,8 +234,12 @@ def extract_specs_from_page(page, product_name, retries=2):
 
     return specs
 
-def matches_requirements(product, requirements):
-    """Check if a product matches the customer's requirements."""
+def matches_requirements(product, requirements, verbose=False):
+    """Check if a product matches the customer's requirements.
+
+    These checks never log; verbose is accepted so callers can use either
+    site's matcher the same way.
+    """
     specs = product["specifications"]
     price = product["price"]
 
@@ -292,134 +307,162 @@ def matches_requirements(product, requirements):
 
     return True
 
-def search_amazon(query, requirements, max_results=10, max_pages=5):  # Increased to 5 pages
-    """Search Amazon for products based on the query and filter by requirements."""
-    products = []
-    seen_names = set()  # To track duplicates
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        user_agent = random.choice(USER_AGENTS)
-        context = browser.new_context(
-            user_agent=user_agent,
-            viewport={"width": 1280, "height": 720}
-        )
-        page = context.new_page()
+def parse_search_results(page):
+    """Collect raw listing records from a loaded search results page.
 
-        current_page = 1
-        while current_page <= max_pages and len(products) < max_results:
-            # Perform the search
-            try:
-                search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}&page={current_page}"
-                print(f"Scraping page {current_page}: {search_url}")
-                page.goto(search_url, timeout=30000)
-                page.wait_for_load_state("domcontentloaded")
-                page.wait_for_timeout(5000)
-            except Exception as e:
-                print(f"Failed to load search page {current_page} for query '{query}': {e}")
-                break
+    Returns the records and whether there is a next results page.
+    """
+    items = page.query_selector_all(".s-result-item, .s-card-container")
+    records = []
+    for item in items:
+        try:
+            if item.query_selector(".s-sponsored-label") or item.query_selector(".s-pagination-item"):
+                continue
+        except Exception:
+            continue
 
-            # Collect product data from search results
-            items = page.query_selector_all(".s-result-item, .s-card-container")
-            product_data = []
-            for item in items:
-                try:
-                    if item.query_selector(".s-sponsored-label") or item.query_selector(".s-pagination-item"):
-                        continue
-                except Exception:
-                    continue
+        name_element = item.query_selector("h2 a span, .a-text-normal")
+        price_element = item.query_selector(".a-price-whole, .a-price .a-offscreen")
+        rating_element = item.query_selector(".a-icon-alt, span[aria-label*='out of 5 stars']")
+        link_element = item.query_selector("a.a-link-normal")
 
-                name_element = item.query_selector("h2 a span, .a-text-normal")
-                price_element = item.query_selector(".a-price-whole, .a-price .a-offscreen")
-                rating_element = item.query_selector(".a-icon-alt, span[aria-label*='out of 5 stars']")
-                link_element = item.query_selector("a.a-link-normal")
+        name = name_element.text_content().strip() if name_element else "N/A"
+        price = price_element.text_content().replace(",", "").strip() if price_element else "N/A"
+        rating = rating_element.text_content().strip() if rating_element else "N/A"
+        link = link_element.get_attribute("href") if link_element else "N/A"
 
-                name = name_element.text_content().strip() if name_element else "N/A"
-                price = price_element.text_content().replace(",", "").strip() if price_element else "N/A"
-                rating = rating_element.text_content().strip() if rating_element else "N/A"
-                link = link_element.get_attribute("href") if link_element else "N/A"
+        if name == "N/A" or "page" in name.lower() or "buying options" in name.lower():
+            continue
 
-                if name == "N/A" or "page" in name.lower() or "buying options" in name.lower():
-                    continue
+        if link != "N/A":
+            link = link if link.startswith("https://") else f"https://www.amazon.in{link}"
 
-                # Skip desktops if the query is for laptops
-                if "laptop" in query.lower() and ("desktop" in name.lower() or "computer pc" in name.lower()):
-                    print(f"Skipping desktop product: {name}")
-                    continue
+        records.append({
+            "name": name,
+            "price": price,
+            "rating": rating,
+            "link": link
+        })
 
-                if name in seen_names:
-                    continue
-                seen_names.add(name)
+    next_page_button = page.query_selector("a.s-pagination-next")
+    has_next = bool(next_page_button) and "s-pagination-disabled" not in (next_page_button.get_attribute("class") or "")
+    return records, has_next
 
-                if link != "N/A":
-                    link = link if link.startswith("https://") else f"https://www.amazon.in{link}"
+def fetch_product_specs(session, product, max_attempts=2):
+    """Visit a product page and return its specs, falling back to the listing's specs."""
+    for attempt in range(max_attempts):
+        try:
+            product_page = session.new_page()
+            product_page.goto(product["link"], timeout=session.timeout(30000))
+            product_page.wait_for_load_state("domcontentloaded")
+            specs = extract_specs_from_page(product_page, product["name"], session=session)
+            product_page.close()
+            session.pause(1, 3)  # Random delay to avoid bot detection
+            return specs
+        except Exception as e:
+            print(f"Attempt {attempt + 1} failed to scrape product page for {product['name']}: {e}")
+            if attempt < max_attempts - 1:
+                print(f"Retrying with a different user agent... ({attempt + 1}/{max_attempts})")
+                session.rotate_context()
+                session.pause(2, 5)
+            else:
+                print(f"All attempts failed for {product['name']}. Using specs from name.")
+    return product["specifications"]
 
-                product_data.append({
-                    "name": name,
-                    "price": price,
-                    "rating": rating,
-                    "link": link
-                })
+def load_search_page(session, query, page_number, cache=None):
+    """Return (records, has_next, cached) for a results page, or None if it failed to load."""
+    cached = cache.get(SITE, query, page_number) if cache else None
+    if cached:
+        print(f"Using cached results for page {page_number} of '{query}'")
+        return cached[0], cached[1], True
 
-            # Process the products on this page
-            for i, data in enumerate(product_data):
-                if len(products) >= max_results:
-                    break
+    # Perform the search
+    try:
+        page = session.page
+        search_url = f"https://www.amazon.in/s?k={query.replace(' ', '+')}&page={page_number}"
+        print(f"Scraping page {page_number}: {search_url}")
+        page.goto(search_url, timeout=session.timeout(30000))
+        page.wait_for_load_state("domcontentloaded")
+        session.wait(page, 5000)
+    except Exception as e:
+        print(f"Failed to load search page {page_number} for query '{query}': {e}")
+        return None
+
+    # Collect product data from search results
+    records, has_next = parse_search_results(page)
+    if cache:
+        cache.put(SITE, query, page_number, records, has_next)
+    return records, has_next, False
+
+def build_candidates(records, query, seen_names):
+    """Turn raw listing records into products with specs parsed from their names."""
+    candidates = []
+    for data in records:
+        # Skip desktops if the query is for laptops
+        if "laptop" in query.lower() and ("desktop" in data["name"].lower() or "computer pc" in data["name"].lower()):
+            print(f"Skipping desktop product: {data['name']}")
+            continue
 
-                # Skip if the link is malformed
-                if not data["link"].startswith("https://www.amazon.in") or "#" in data["link"]:
-                    print(f"Skipping malformed link for {data['name']}: {data['link']}")
-                    continue
+        if data["name"] in seen_names:
+            continue
+        seen_names.add(data["name"])
 
-                # Extract initial specs from name
-                detailed_specs = extract_specs_from_name(data["name"])
-
-                # Visit product page only for the top 3 matches per page to confirm critical specs
-                if i < 3:
-                    max_attempts = 2
-                    for attempt in range(max_attempts):
-                        try:
-                            product_page = context.new_page()
-                            product_page.goto(data["link"], timeout=30000)
-                            product_page.wait_for_load_state("domcontentloaded")
-                            detailed_specs = extract_specs_from_page(product_page, data["name"])
-                            product_page.close()
-                            time.sleep(random.uniform(1, 3))  # Random delay to avoid bot detection
-                            break
-                        except Exception as e:
-                            print(f"Attempt {attempt + 1} failed to scrape product page for {data['name']}: {e}")
-                            if attempt < max_attempts - 1:
-                                print(f"Retrying with a different user agent... ({attempt + 1}/{max_attempts})")
-                                context = browser.new_context(
-                                    user_agent=random.choice(USER_AGENTS),
-                                    viewport={"width": 1280, "height": 720}
-                                )
-                                time.sleep(random.uniform(2, 5))
-                                continue
-                            else:
-                                print(f"All attempts failed for {data['name']}. Using specs from name.")
-
-                product = {
-                    "site": "Amazon",
-                    "category": "laptop" if "laptop" in query.lower() else "phone",
-                    "name": data["name"],
-                    "price": data["price"] if data["price"] != "N/A" else "N/A",
-                    "rating": data["rating"],
-                    "link": data["link"],
-                    "specifications": detailed_specs
-                }
-
-                # Filter based on requirements
+        # Skip if the link is malformed
+        if not data["link"].startswith("https://www.amazon.in") or "#" in data["link"]:
+            print(f"Skipping malformed link for {data['name']}: {data['link']}")
+            continue
+
+        candidates.append({
+            "site": SITE,
+            "category": "laptop" if "laptop" in query.lower() else "phone",
+            "name": data["name"],
+            "price": data["price"] if data["price"] != "N/A" else "N/A",
+            "rating": data["rating"],
+            "link": data["link"],
+            "specifications": extract_specs_from_name(data["name"])
+        })
+    return candidates
+
+def search_amazon(query, requirements, max_results=10, max_pages=5, max_detail_visits=6, cache=None, archive=None):  # Increased to 5 pages
+    """Search Amazon for products based on the query and filter by requirements.
+
+    At most max_detail_visits product pages are visited per query. Results
+    pages found in cache (a ListingCache) are reused without opening a browser.
+    With a NetworkArchive, the session is recorded or replayed.
+    """
+    products = []
+    seen_names = set()  # To track duplicates
+    detail_visits = 0
+    with BrowserSession(USER_AGENTS, archive=archive) as session:
+        current_page = 1
+        while current_page <= max_pages and len(products) < max_results:
+            loaded = load_search_page(session, query, current_page, cache)
+            if loaded is None:
+                break
+            records, has_next, _ = loaded
+
+            candidates = build_candidates(records, query, seen_names)
+
+            # Visit product pages only where a required field is unknown and could decide the match
+            visits = set(plan_enrichment(candidates, requirements, matches_requirements, max_detail_visits - detail_visits))
+
+            # Filter based on requirements, visiting planned pages only while results are still needed
+            for index, product in enumerate(candidates):
+                if len(products) >= max_results:
+                    break
+                if index in visits:
+                    detail_visits += 1
+                    product["specifications"] = fetch_product_specs(session, product)
                 if matches_requirements(product, requirements):
                     products.append(product)
 
             # Check for next page
             current_page += 1
-            next_page_button = page.query_selector("a.s-pagination-next")
-            if not next_page_button or "s-pagination-disabled" in next_page_button.get_attribute("class"):
+            if not has_next:
                 break
 
-        context.close()
-        browser.close()
+    if cache:
+        cache.save()
 
     # Sort products by price
     products.sort(key=lambda x: float(x["price"].replace("₹", "").replace(",", "")) if x["price"] != "N/A" else float("inf"))
@@ -436,11 +479,15 @@ if __name__ == "__main__":
     }
 
     print(f"Searching for: {customer_query}")
-    results = search_amazon(customer_query, requirements, max_results=10, max_pages=5)
+    cache = ListingCache("data/listing_cache.json")
+    results = search_amazon(customer_query, requirements, max_results=10, max_pages=5, cache=cache)
     print(f"Found {len(results)} matching products:")
     for product in results:
         print(json.dumps(product, indent=2))
 
-    # Save results to a file
-    with open("data/amazon_results.json", "w") as f:
-        json.dump(results, f, indent=2)
\ No newline at end of file
+    # Save results to a file. The store keeps one copy per product ID, so
+    # listings sharing an ASIN (e.g. a sponsored and an organic slot) are stored once
+    ResultStore("data/amazon_results.lrs").write(results)
+
+    # Keep the price movement of every result
+    PriceHistory().record(results)
\ No newline at end of file
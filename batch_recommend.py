@@ -0,0 +1,91 @@
+import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from amazon_search import matches_requirements
+from combine_and_recommend import (categorize_laptop, compute_score, dedupe_key, load_json, normalize_os,
+                                   process_products, results_file, select_recommendations)
+
+def _evaluate_chunk(args):
+    """Catalog indices of the chunk's products that match each profile."""
+    chunk, start, requirements_list = args
+    matches = [array("I") for _ in requirements_list]
+    for offset, product in enumerate(chunk):
+        for requirements, matched in zip(requirements_list, matches):
+            if matches_requirements(product, requirements):
+                matched.append(start + offset)
+    return matches
+
+def recommend_for_profile(products, profile):
+    """Recommend for one profile the way a single search does: filter, then deduplicate, score and rank."""
+    matched = [product for product in products if matches_requirements(product, profile.get("requirements", {}))]
+    catalog = process_products(matched)
+    ranked = sorted(range(len(catalog)), key=lambda i: catalog[i][2], reverse=True)
+    categories = [category for _, category, _ in catalog]
+    return [[catalog[i][0], categories[i]] for i in select_recommendations(categories, ranked, profile.get("top_n", 5))]
+
+def recommend_batch(products, profiles, workers=None, chunk_size=2000):
+    """Recommend for many profiles in one pass over the catalog.
+
+    Each profile is a dict with "requirements" (as for matches_requirements)
+    and "top_n". A single pass records, per profile, the products it matches
+    as a compact array of catalog indices. Every product is categorized,
+    scored and ranked once. Each profile then keeps the first product of
+    each name among its own matches, as recommend_for_profile does, and
+    select_recommendations picks its list from those. With workers set,
+    chunks of the catalog are matched in parallel processes.
+    Returns one [[product, category], ...] list per profile, the same as
+    recommend_for_profile.
+    """
+    requirements_list = [profile.get("requirements", {}) for profile in profiles]
+    chunks = [(products[i:i + chunk_size], i, requirements_list) for i in range(0, len(products), chunk_size)]
+    if workers and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_matches = list(executor.map(_evaluate_chunk, chunks))
+    else:
+        chunk_matches = [_evaluate_chunk(chunk) for chunk in chunks]
+
+    # Normalize, categorize and score every listing once, after matching as a search does
+    categories = []
+    scores = []
+    name_keys = []
+    for product in products:
+        specs = product["specifications"]
+        specs["os"] = normalize_os(specs.get("os", "N/A"))
+        categories.append(categorize_laptop(specs))
+        scores.append(compute_score(product))
+        name_keys.append(dedupe_key(product))
+    ranked = sorted(range(len(products)), key=scores.__getitem__, reverse=True)
+    rank_of = array("I", bytes(4 * len(products)))
+    for rank, i in enumerate(ranked):
+        rank_of[i] = rank
+
+    results = []
+    for p, profile in enumerate(profiles):
+        # First product of each name among the matches, in catalog order
+        seen = set()
+        kept = array("I")
+        for matches in chunk_matches:
+            for i in matches[p]:
+                if name_keys[i] not in seen:
+                    seen.add(name_keys[i])
+                    kept.append(i)
+        kept = sorted(kept, key=rank_of.__getitem__)
+        category_count = len(set(categories[i] for i in kept))
+        selected = select_recommendations(categories, kept, profile.get("top_n", 5), category_count)
+        results.append([[products[i], categories[i]] for i in selected])
+    return results
+
+if __name__ == "__main__":
+    products = load_json(results_file("flipkart_results")) + load_json(results_file("amazon_results"))
+    profiles = [
+        {"requirements": {"processor": "i5", "ram": "16GB", "max_price": 60000}, "top_n": 3},
+        {"requirements": {"processor": "i7", "ssd": "1TB", "max_price": 150000}, "top_n": 5},
+        {"requirements": {"max_price": 50000}, "top_n": 10},
+    ]
+
+    results = recommend_batch(products, profiles, workers=os.cpu_count())
+    for profile, recommended in zip(profiles, results):
+        print(f"{json.dumps(profile['requirements'])}: {len(recommended)} recommendations")
+        for product, category in recommended:
+            print(f"   {product['name']} ({product['site']}): {product['price']} [{category}]")
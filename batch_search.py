@@ -0,0 +1,114 @@
+import json
+from collections import OrderedDict
+from browser_session import BrowserSession
+from enrichment import plan_enrichment
+from listing_cache import ListingCache, normalize_query
+from product_ids import extract_product_id
+
+def apply_detail_specs(candidates, detail_specs):
+    """Give candidates the specs already fetched from their product pages."""
+    for product in candidates:
+        product_id = extract_product_id(product["link"])
+        if product_id in detail_specs:
+            product["specifications"] = dict(detail_specs[product_id])
+
+def search_batch(site, jobs, max_results=10, max_pages=5, max_detail_visits=6, cache=None, archive=None):
+    """Run many (query, requirements) jobs against one site with shared page fetches.
+
+    site is a scraper module such as amazon_search. Each round loads the next
+    results page of every unfinished job, once per normalized query, then
+    visits the product pages the jobs' enrichment plans ask for, once per
+    product ID, and filters every job against the shared results.
+    With a NetworkArchive, the session is recorded or replayed.
+    Returns one product list per job, in job order.
+    """
+    states = [{
+        "query": query,
+        "requirements": requirements,
+        "products": [],
+        "seen_names": set(),
+        "detail_visits": 0,
+        "done": False
+    } for query, requirements in jobs]
+    detail_specs = {}  # Product ID -> specs from its product page
+    search_fetches = 0
+
+    with BrowserSession(site.USER_AGENTS, archive=archive) as session:
+        for page_number in range(1, max_pages + 1):
+            active = [state for state in states if not state["done"]]
+            if not active:
+                break
+
+            # Load each distinct results page once
+            pages = {}
+            for state in active:
+                key = normalize_query(state["query"])
+                if key not in pages:
+                    pages[key] = site.load_search_page(session, state["query"], page_number, cache)
+                    if pages[key] and not pages[key][2]:
+                        search_fetches += 1
+
+            # Plan product page visits for every job, queueing each product once
+            detail_queue = OrderedDict()
+            for state in active:
+                loaded = pages[normalize_query(state["query"])]
+                if loaded is None:
+                    state["done"] = True
+                    continue
+                records, state["has_next"], _ = loaded
+                candidates = site.build_candidates(records, state["query"], state["seen_names"])
+                apply_detail_specs(candidates, detail_specs)
+                state["candidates"] = candidates
+
+                # No more visits than results still needed, a full job ignores the rest
+                budget = min(max_detail_visits - state["detail_visits"], max_results - len(state["products"]))
+                for index in plan_enrichment(candidates, state["requirements"], site.matches_requirements, budget):
+                    product_id = extract_product_id(candidates[index]["link"])
+                    if product_id in detail_specs:
+                        continue  # Already visited, the page has nothing new
+                    state["detail_visits"] += 1
+                    detail_queue.setdefault(product_id, candidates[index])
+
+            for product_id, product in detail_queue.items():
+                detail_specs[product_id] = site.fetch_product_specs(session, product)
+
+            # Filter every job against the shared results
+            for state in active:
+                if state["done"]:
+                    continue
+                candidates = state.pop("candidates")
+                apply_detail_specs(candidates, detail_specs)
+                for product in candidates:
+                    if len(state["products"]) >= max_results:
+                        break
+                    if site.matches_requirements(product, state["requirements"]):
+                        state["products"].append(product)
+                if len(state["products"]) >= max_results or not state["has_next"]:
+                    state["done"] = True
+
+    if cache:
+        cache.save()
+
+    print(f"Batch of {len(jobs)} jobs fetched {search_fetches} search pages and {len(detail_specs)} product pages")
+    results = []
+    for state in states:
+        products = state["products"]
+        products.sort(key=lambda x: float(x["price"].replace("₹", "").replace(",", "")) if x["price"] != "N/A" else float("inf"))
+        results.append(products)
+    return results
+
+if __name__ == "__main__":
+    import amazon_search
+
+    jobs = [
+        ("laptop with i5 processor 16GB RAM", {"processor": "i5", "ram": "16GB", "max_price": 80000}),
+        ("i5 16gb ram laptop", {"processor": "i5", "ram": "16GB", "weight": "1.8", "max_price": 100000}),
+        ("laptop with i7 processor 16GB RAM 1TB SSD", {"processor": "i7", "ram": "16GB", "ssd": "1TB", "max_price": 150000}),
+    ]
+
+    cache = ListingCache("data/listing_cache.json")
+    results = search_batch(amazon_search, jobs, max_results=10, max_pages=3, cache=cache)
+    for (query, _), products in zip(jobs, results):
+        print(f"{query}: {len(products)} matching products")
+        for product in products:
+            print(json.dumps(product, indent=2))
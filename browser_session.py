@@ -0,0 +1,97 @@
+import random
+import time
+
+# Replayed pages are local, so waiting longer than this for an element is pointless
+REPLAY_TIMEOUT = 2000
+
+class BrowserSession:
+    """Playwright browser that is only launched when a page is first needed.
+
+    With a NetworkArchive, every context routes its requests through it. When
+    the archive is replaying, the bot-avoidance pauses are skipped and element
+    timeouts are capped, so a captured session re-runs at local-disk speed.
+    """
+
+    def __init__(self, user_agents, headless=True, archive=None):
+        self.user_agents = user_agents
+        self.headless = headless
+        self.archive = archive
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def started(self):
+        return self._browser is not None
+
+    @property
+    def replaying(self):
+        return self.archive is not None and self.archive.replaying
+
+    def _new_context(self):
+        context = self._browser.new_context(
+            user_agent=random.choice(self.user_agents),
+            viewport={"width": 1280, "height": 720}
+        )
+        if self.archive is not None:
+            self.archive.attach(context)
+        return context
+
+    def pause(self, low, high):
+        """Sleep a random number of seconds between low and high, unless replaying."""
+        if not self.replaying:
+            time.sleep(random.uniform(low, high))
+
+    def wait(self, page, milliseconds):
+        """Give a page time to settle, unless replaying."""
+        if not self.replaying:
+            page.wait_for_timeout(milliseconds)
+
+    def timeout(self, milliseconds):
+        """Timeout to use for page operations."""
+        return min(milliseconds, REPLAY_TIMEOUT) if self.replaying else milliseconds
+
+    @property
+    def context(self):
+        """Current browser context, launching the browser on first use."""
+        if self._browser is None:
+            # Imported here so modules that only reuse the parsing and filtering
+            # helpers never load Playwright
+            from playwright.sync_api import sync_playwright
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch(headless=self.headless)
+            self._context = self._new_context()
+        return self._context
+
+    @property
+    def page(self):
+        """Page used for search results."""
+        if self._page is None:
+            self._page = self.context.new_page()
+        return self._page
+
+    def new_page(self):
+        """Open a new page, e.g. for a product detail visit."""
+        return self.context.new_page()
+
+    def rotate_context(self):
+        """Switch new pages to a fresh context with a different user agent."""
+        self.context  # Make sure the browser is running
+        self._context = self._new_context()
+        return self._context
+
+    def close(self):
+        if self._browser is not None:
+            self._browser.close()
+            self._playwright.stop()
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._page = None
@@ -0,0 +1,200 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+
+MAGIC = b"LRSNAP01"
+VERSION = 1
+MISSING = 0xFFFFFFFF  # String index for a field the product does not have
+PRODUCT_FIELDS = ["site", "category", "name", "price", "rating", "link"]
+CATEGORIES = ["Gaming", "Ultraportable", "Creator", "Productivity"]
+
+def source_signature(source_files):
+    """Size and modification time of each source file, or None for a missing one."""
+    signature = []
+    for path in source_files:
+        try:
+            stat = os.stat(path)
+            signature.append([path, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            signature.append([path, None, None])
+    return signature
+
+def _string_index(strings, table, value):
+    if value is None:
+        return MISSING
+    index = table.get(value)
+    if index is None:
+        index = table[value] = len(strings)
+        strings.append(value)
+    return index
+
+def build_snapshot(entries, source_files):
+    """Encode the processed catalog as snapshot bytes.
+
+    entries holds (product, category, score, price, rating) tuples in catalog
+    order. Strings go into a shared string table and every field becomes an
+    array-backed column, so a loaded snapshot can be read in place.
+    """
+    spec_fields = []
+    for product, *_ in entries:
+        for key in product["specifications"]:
+            if key not in spec_fields:
+                spec_fields.append(key)
+
+    strings = []
+    table = {}
+    columns = {}
+    for field in PRODUCT_FIELDS:
+        columns[field] = array("I", (_string_index(strings, table, p.get(field)) for p, *_ in entries))
+    for field in spec_fields:
+        columns["spec:" + field] = array("I", (_string_index(strings, table, p["specifications"].get(field)) for p, *_ in entries))
+    columns["score"] = array("d", (e[2] for e in entries))
+    columns["price_value"] = array("d", (e[3] for e in entries))
+    columns["rating_value"] = array("d", (e[4] for e in entries))
+    columns["category_code"] = array("B", (CATEGORIES.index(e[1]) for e in entries))
+    # Rank order: indices by score, highest first, ties in catalog order
+    columns["rank"] = array("I", sorted(range(len(entries)), key=lambda i: entries[i][2], reverse=True))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    columns["string_offsets"] = offsets
+    blob = b"".join(encoded)
+
+    # Lay out the sections, each aligned to 8 bytes
+    sections = {}
+    payload = []
+    position = 0
+    for name, column in list(columns.items()) + [("string_data", blob)]:
+        data = column.tobytes() if isinstance(column, array) else column
+        typecode = column.typecode if isinstance(column, array) else "B"
+        sections[name] = [position, len(data), typecode]
+        padding = (-len(data)) % 8
+        payload.append(data + b"\0" * padding)
+        position += len(data) + padding
+
+    header = json.dumps({
+        "version": VERSION,
+        "count": len(entries),
+        "category_count": len(set(e[1] for e in entries)),
+        "spec_fields": spec_fields,
+        "sources": source_signature(source_files),
+        "sections": sections
+    }).encode("utf-8")
+    header += b" " * ((-(len(MAGIC) + 4 + len(header))) % 8)
+    return MAGIC + struct.pack("<I", len(header)) + header + b"".join(payload)
+
+def write_snapshot(path, entries, source_files):
+    """Write a snapshot atomically, replacing any older one."""
+    data = build_snapshot(entries, source_files)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+class CatalogSnapshot:
+    """Read-only view of a catalog snapshot held in any buffer.
+
+    Columns are memoryviews over the buffer, so nothing is parsed or copied
+    up front; products are only materialized when asked for.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a catalog snapshot")
+        header_length = struct.unpack_from("<I", view, len(MAGIC))[0]
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(view[start:start + header_length]))
+        if header["version"] != VERSION:
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+
+        self._view = view
+        self.count = header["count"]
+        self.category_count = header["category_count"]
+        self.spec_fields = header["spec_fields"]
+        self.sources = header["sources"]
+        self._mmap = None
+        self._file = None
+
+        data_start = start + header_length
+        self.columns = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            self.columns[name] = view[data_start + offset:data_start + offset + length].cast(typecode)
+        self.scores = self.columns["score"]
+        self.prices = self.columns["price_value"]
+        self.ratings = self.columns["rating_value"]
+        self.category_codes = self.columns["category_code"]
+        self.rank = self.columns["rank"]
+        self._offsets = self.columns["string_offsets"]
+        self._strings = self.columns["string_data"]
+
+    @classmethod
+    def open(cls, path):
+        """Memory-map a snapshot file."""
+        f = open(path, "rb")
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+        snapshot = cls(mapped)
+        snapshot._mmap = mapped
+        snapshot._file = f
+        return snapshot
+
+    def close(self):
+        for column in self.columns.values():
+            column.release()
+        self._view.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def is_fresh(self, source_files):
+        """Check the snapshot was built from the current versions of source_files."""
+        return self.sources == source_signature(source_files)
+
+    def string(self, index):
+        if index == MISSING:
+            return None
+        return bytes(self._strings[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def category(self, i):
+        return CATEGORIES[self.category_codes[i]]
+
+    def product(self, i):
+        """Rebuild the product dict at index i."""
+        product = {}
+        for field in PRODUCT_FIELDS:
+            value = self.string(self.columns[field][i])
+            if value is not None:
+                product[field] = value
+        specs = {}
+        for field in self.spec_fields:
+            value = self.string(self.columns["spec:" + field][i])
+            if value is not None:
+                specs[field] = value
+        product["specifications"] = specs
+        return product
+
+def open_snapshot(path, source_files):
+    """Open the snapshot at path if it exists and matches source_files, else return None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = CatalogSnapshot.open(path)
+    except (ValueError, OSError) as e:
+        print(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+    if not snapshot.is_fresh(source_files):
+        snapshot.close()
+        return None
+    return snapshot
@@ -1,15 +1,25 @@
 import json
 import os
 from collections import OrderedDict
+from catalog_snapshot import CatalogSnapshot, open_snapshot, write_snapshot
+from product_ids import canonical_link
+from result_store import ResultStore
 
 def load_json(file_path):
-    """Load JSON data from a file."""
+    """Load products from a JSON file, or from a result store if the path ends in .lrs."""
     if not os.path.exists(file_path):
         print(f"File {file_path} not found.")
         return []
+    if file_path.endswith(".lrs"):
+        return ResultStore(file_path).records()
     with open(file_path, 'r') as f:
         return json.load(f)
 
+def results_file(name):
+    """Path of scrape results: the result store if a scrape wrote one, else the JSON file."""
+    store_file = f"data/{name}.lrs"
+    return store_file if os.path.exists(store_file) else f"data/{name}.json"
+
 def normalize_os(os_value):
     """Normalize OS formatting for consistency."""
     if not os_value or os_value == "N/A":
@@ -48,23 +58,32 @@ def categorize_laptop(specs):
     # Default: Productivity
     return "Productivity"
 
-def compute_score(product):
-    """Compute a weighted score based on price and rating."""
+def parse_price(product):
+    """Parse the product price, or return inf if it is unparseable."""
     try:
         # Extract price (remove ₹ and commas)
-        price = float(product["price"].replace("₹", "").replace(",", ""))
+        return float(product["price"].replace("₹", "").replace(",", ""))
     except (ValueError, AttributeError):
-        price = float("inf")  # High price if unparseable
+        return float("inf")  # High price if unparseable
 
-    # Parse rating
+def parse_rating(product):
+    """Parse the product rating, or return 0 if it is missing or unparseable."""
     try:
         rating_str = product["rating"]
         if "out of" in rating_str:
-            rating = float(rating_str.split()[0])
-        else:
-            rating = float(rating_str)
+            return float(rating_str.split()[0])
+        return float(rating_str)
     except (ValueError, AttributeError):
-        rating = 0  # Default to 0 if rating is missing or unparseable
+        return 0
+
+def compute_score(product, history=None):
+    """Compute a weighted score based on price and rating.
+
+    With a PriceHistory, products priced below their usual price or that just
+    dropped below every other price of the last 30 days score higher.
+    """
+    price = parse_price(product)
+    rating = parse_rating(product)
 
     # Weighted score: Lower price and higher rating are better
     # Normalize price (lower is better) and rating (higher is better)
@@ -73,32 +92,38 @@ def compute_score(product):
         score = rating * 5  # If price is unparseable, rely on rating
     else:
         score = (rating * 5) - (price / 10000)  # Rating has more weight
+
+    if history is not None and price != float("inf"):
+        signals = history.price_signals(product)
+        if signals["discount_vs_median"]:
+            score += signals["discount_vs_median"] * 10  # 10% below median adds 1
+        if signals["at_30d_low"]:
+            score += 0.5
     return score
 
+def dedupe_key(product):
+    """Simplify the product name for deduplication (remove model numbers and extra details)."""
+    name = product["name"].lower()
+    return " ".join(name.split()[:5])  # First 5 words for deduplication
+
 def deduplicate_products(products):
     """Deduplicate products based on name similarity."""
     seen = set()
     deduplicated = []
     for product in products:
-        # Simplify name for deduplication (remove model numbers and extra details)
-        name = product["name"].lower()
-        name_key = " ".join(name.split()[:5])  # First 5 words for deduplication
+        name_key = dedupe_key(product)
         if name_key not in seen:
             seen.add(name_key)
             deduplicated.append(product)
     return deduplicated
 
-def combine_and_recommend(flipkart_file, amazon_file, top_n=5):
-    """Combine products from Flipkart and Amazon, categorize, and recommend."""
-    # Load data
-    flipkart_products = load_json(flipkart_file)
-    amazon_products = load_json(amazon_file)
-
-    # Combine all products
-    all_products = flipkart_products + amazon_products
+def process_products(products, history=None):
+    """Deduplicate, normalize, categorize and score products.
 
+    Returns (product, category, score) tuples in catalog order.
+    """
     # Deduplicate products
-    deduplicated_products = deduplicate_products(all_products)
+    deduplicated_products = deduplicate_products(products)
     print(f"Total deduplicated products: {len(deduplicated_products)}")
 
     # Categorize and normalize specs
@@ -110,31 +135,95 @@ def combine_and_recommend(flipkart_file, amazon_file, top_n=5):
         # Categorize
         category = categorize_laptop(specs)
         # Compute score
-        score = compute_score(product)
+        score = compute_score(product, history)
         categorized_products.append((product, category, score))
+    return categorized_products
+
+def select_recommendations(categories, ranked, top_n, category_count=None):
+    """Select top_n indices, covering as many categories as possible first.
 
-    # Sort by score (higher is better)
-    categorized_products.sort(key=lambda x: x[2], reverse=True)
+    categories gives each product's category and ranked the product indices
+    by score, highest first.
+    """
+    if category_count is None:
+        category_count = len(set(categories))
 
-    # Select top N products, ensuring diversity in categories
-    selected_products = []
+    selected = []
     seen_categories = set()
-    for product, category, score in categorized_products:
-        if len(selected_products) >= top_n:
+    for i in ranked:
+        if len(selected) >= top_n:
             break
         # Add at least one product from each category if possible
-        if category not in seen_categories or len(selected_products) >= len(set(c[1] for c in categorized_products)):
-            selected_products.append((product, category))
-            seen_categories.add(category)
+        if categories[i] not in seen_categories or len(selected) >= category_count:
+            selected.append(i)
+            seen_categories.add(categories[i])
 
     # If we don't have enough products, fill with highest-scored remaining
-    remaining = [(p, c) for p, c, s in sorted(categorized_products, key=lambda x: x[2], reverse=True) if (p, c) not in selected_products]
-    selected_products.extend(remaining[:top_n - len(selected_products)])
+    if len(selected) < top_n:
+        chosen = set(selected)
+        remaining = [i for i in ranked if i not in chosen]
+        selected.extend(remaining[:top_n - len(selected)])
+    return selected
+
+def build_catalog_entries(source_files, history=None):
+    """Load and process the source JSON files into snapshot entries."""
+    all_products = []
+    for file_path in source_files:
+        all_products += load_json(file_path)
+    return [
+        (product, category, score, parse_price(product), parse_rating(product))
+        for product, category, score in process_products(all_products, history)
+    ]
+
+def load_catalog_snapshot(snapshot_file, source_files, history=None):
+    """Open the catalog snapshot, rebuilding it first if the source files changed."""
+    # Scores depend on the price history, so a new observation invalidates the snapshot too
+    signature_files = source_files + (history.files() if history is not None else [])
+    snapshot = open_snapshot(snapshot_file, signature_files)
+    if snapshot is None:
+        print(f"Building catalog snapshot {snapshot_file}")
+        write_snapshot(snapshot_file, build_catalog_entries(source_files, history), signature_files)
+        snapshot = CatalogSnapshot.open(snapshot_file)
+    return snapshot
+
+def recommend_from_snapshot(snapshot, top_n=5):
+    """Select recommendations from a catalog snapshot as (product, category) pairs."""
+    # Category codes stand in for the names, only equality matters for the selection
+    selected = select_recommendations(snapshot.category_codes, snapshot.rank, top_n, snapshot.category_count)
+    return [(snapshot.product(i), snapshot.category(i)) for i in selected]
+
+def combine_and_recommend(flipkart_file, amazon_file, top_n=5, snapshot_file=None, history=None):
+    """Combine products from Flipkart and Amazon, categorize, and recommend.
+
+    With snapshot_file set, the processed catalog is read from a binary
+    snapshot, which is rebuilt whenever either JSON file changes. With a
+    PriceHistory, scores take price trends into account.
+    """
+    if snapshot_file:
+        snapshot = load_catalog_snapshot(snapshot_file, [flipkart_file, amazon_file], history)
+        selected_products = recommend_from_snapshot(snapshot, top_n)
+        snapshot.close()
+    else:
+        # Load data
+        flipkart_products = load_json(flipkart_file)
+        amazon_products = load_json(amazon_file)
+
+        # Combine all products
+        all_products = flipkart_products + amazon_products
+        categorized_products = process_products(all_products, history)
+
+        # Sort by score (higher is better)
+        ranked = sorted(range(len(categorized_products)), key=lambda i: categorized_products[i][2], reverse=True)
+        categories = [category for _, category, _ in categorized_products]
+        selected = select_recommendations(categories, ranked, top_n)
+        selected_products = [(categorized_products[i][0], categories[i]) for i in selected]
 
     # Print recommendations
     print("\nRecommended Laptops:")
     recommended_list = []
     for i, (product, category) in enumerate(selected_products, 1):
+        # Tracking parameters make up most of a link
+        product = dict(product, link=canonical_link(product["link"]))
         specs = product["specifications"]
         specs_str = f"{specs['processor']}, {specs['ram']}, {specs['ssd']}, {specs['display_size']}, {specs['resolution']}, {specs['weight']}, {specs['gpu']}, {specs['os']}"
         print(f"{i}. {product['name']} ({product['site']}): {product['price']}")
@@ -153,6 +242,9 @@ def combine_and_recommend(flipkart_file, amazon_file, top_n=5):
     return recommended_list
 
 if __name__ == "__main__":
-    flipkart_file = "data/flipkart_results.json"
-    amazon_file = "data/amazon_results.json"
-    recommended = combine_and_recommend(flipkart_file, amazon_file, top_n=10)
\ No newline at end of file
+    flipkart_file = results_file("flipkart_results")
+    amazon_file = results_file("amazon_results")
+    from price_history import PriceHistory
+    history = PriceHistory()
+    recommended = combine_and_recommend(flipkart_file, amazon_file, top_n=10, snapshot_file="data/catalog.snapshot", history=history)
+    history.close()
\ No newline at end of file
@@ -0,0 +1,182 @@
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    site TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, not_before);
+CREATE TABLE IF NOT EXISTS hosts (
+    site TEXT PRIMARY KEY,
+    next_allowed REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    site TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class CrawlQueue:
+    """Durable crawl task queue and result store in a local SQLite file.
+
+    Workers lease tasks for lease_seconds. A task whose lease expires, e.g.
+    because its worker crashed, becomes claimable again. A task that fails
+    max_attempts times is moved to the 'dead' state instead of being retried.
+    Each site is claimed at most once every min_interval seconds across all
+    workers, which keeps the crawl inside the per-host rate limit.
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3, min_interval=2.0, retry_delay=30):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.min_interval = min_interval
+        self.retry_delay = retry_delay
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def put(self, key, kind, site, payload):
+        """Add a task unless one with the same key already exists. Returns True if added."""
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO tasks (key, kind, site, payload) VALUES (?, ?, ?, ?)",
+            (key, kind, site, json.dumps(payload))
+        )
+        return cursor.rowcount == 1
+
+    def claim(self, worker_id):
+        """Lease the next runnable task, or return None if none is runnable now."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                """
+                SELECT tasks.* FROM tasks LEFT JOIN hosts ON hosts.site = tasks.site
+                WHERE ((tasks.state = 'pending' AND tasks.not_before <= ?)
+                       OR (tasks.state = 'leased' AND tasks.lease_expires <= ?))
+                  AND COALESCE(hosts.next_allowed, 0) <= ?
+                ORDER BY tasks.id LIMIT 1
+                """,
+                (now, now, now)
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            if row["state"] == "leased" and row["attempts"] >= self.max_attempts:
+                # Its worker died on the last attempt
+                self.conn.execute(
+                    "UPDATE tasks SET state = 'dead', lease_owner = NULL, last_error = ? WHERE id = ?",
+                    (f"lease expired after {row['attempts']} attempts", row["id"])
+                )
+                self.conn.execute("COMMIT")
+                return self.claim(worker_id)
+
+            self.conn.execute(
+                "UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ? WHERE id = ?",
+                (worker_id, now + self.lease_seconds, row["id"])
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hosts (site, next_allowed) VALUES (?, ?)",
+                (row["site"], now + self.min_interval)
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["attempts"] += 1
+        return task
+
+    def complete(self, task, worker_id, results=(), follow_ups=()):
+        """Finish a leased task, storing its results and queueing follow-up tasks atomically.
+
+        results holds (key, kind, payload) tuples, follow_ups (key, kind, site, payload).
+        Returns False if the lease was lost to another worker in the meantime.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(
+                "UPDATE tasks SET state = 'done', lease_owner = NULL, last_error = NULL WHERE id = ? AND lease_owner = ? AND state = 'leased'",
+                (task["id"], worker_id)
+            )
+            if cursor.rowcount == 0:
+                self.conn.execute("ROLLBACK")
+                return False
+            for key, kind, payload in results:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results (key, kind, site, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, kind, task["site"], json.dumps(payload), now)
+                )
+            for key, kind, site, payload in follow_ups:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO tasks (key, kind, site, payload) VALUES (?, ?, ?, ?)",
+                    (key, kind, site, json.dumps(payload))
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def fail(self, task, worker_id, error):
+        """Release a failed task for a later retry, or dead-letter it after max_attempts."""
+        if task["attempts"] >= self.max_attempts:
+            self.conn.execute(
+                "UPDATE tasks SET state = 'dead', lease_owner = NULL, last_error = ? WHERE id = ? AND lease_owner = ?",
+                (str(error), task["id"], worker_id)
+            )
+        else:
+            self.conn.execute(
+                "UPDATE tasks SET state = 'pending', lease_owner = NULL, not_before = ?, last_error = ? WHERE id = ? AND lease_owner = ?",
+                (time.time() + self.retry_delay * task["attempts"], str(error), task["id"], worker_id)
+            )
+
+    def counts(self):
+        """Number of tasks in each state."""
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def unfinished(self):
+        """Number of tasks that are pending or leased."""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')"
+        ).fetchone()[0]
+
+    def dead_letters(self):
+        """Tasks that ran out of attempts, with their last error."""
+        rows = self.conn.execute("SELECT * FROM tasks WHERE state = 'dead' ORDER BY id").fetchall()
+        return [dict(row, payload=json.loads(row["payload"])) for row in rows]
+
+    def requeue_dead(self):
+        """Give dead-lettered tasks a fresh set of attempts."""
+        self.conn.execute("UPDATE tasks SET state = 'pending', attempts = 0, not_before = 0 WHERE state = 'dead'")
+
+    def results(self, kind=None):
+        """Stored result payloads, optionally only those of one kind."""
+        if kind is None:
+            rows = self.conn.execute("SELECT payload FROM results ORDER BY key").fetchall()
+        else:
+            rows = self.conn.execute("SELECT payload FROM results WHERE kind = ? ORDER BY key", (kind,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
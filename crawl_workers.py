@@ -0,0 +1,190 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import amazon_search
+import flipkart_search
+from browser_session import BrowserSession
+from crawl_queue import CrawlQueue
+from enrichment import plan_enrichment
+from listing_cache import normalize_query
+from price_history import PriceHistory
+from product_ids import extract_product_id
+from result_store import ResultStore
+
+SITES = {
+    amazon_search.SITE: amazon_search,
+    flipkart_search.SITE: flipkart_search,
+}
+
+def search_task_key(site, query, page_number, requirements=None):
+    # Tasks of an equivalent query plan different visits per requirements, so they must not collide
+    digest = hashlib.sha1(json.dumps(requirements, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return f"search|{site}|{normalize_query(query)}|{digest}|{page_number}"
+
+def product_key(kind, site, product_id):
+    return f"{kind}|{site}|{product_id}"
+
+def enqueue_crawl(queue, jobs, max_pages=5):
+    """Queue the first results page of every (site, query, requirements) job.
+
+    Each page queues the next one while the site reports more, up to
+    max_pages. With requirements set, only the product pages picked by the
+    enrichment planner are visited, otherwise every listing's product page is.
+    Jobs with equivalent queries share one search, which visits the product
+    pages any of them asks for.
+    """
+    merged = {}  # (site, normalized query) -> [query, requirements list or None for all pages]
+    for site, query, requirements in jobs:
+        job = merged.setdefault((site, normalize_query(query)), [query, []])
+        if requirements is None:
+            job[1] = None
+        elif job[1] is not None and requirements not in job[1]:
+            job[1].append(requirements)
+
+    added = 0
+    for (site, _), (query, requirements_list) in merged.items():
+        payload = {"query": query, "page": 1, "max_pages": max_pages, "requirements": requirements_list}
+        if queue.put(search_task_key(site, query, 1, requirements_list), "search", site, payload):
+            added += 1
+    print(f"Queued {added} search tasks")
+    return added
+
+def run_search_task(site, session, task):
+    """Load a results page; store its listings and queue their product pages and the next page."""
+    payload = task["payload"]
+    loaded = site.load_search_page(session, payload["query"], payload["page"])
+    if loaded is None:
+        raise RuntimeError(f"Failed to load search page {payload['page']} for '{payload['query']}'")
+    records, has_next, _ = loaded
+
+    candidates = site.build_candidates(records, payload["query"], set())
+    if payload["requirements"] is None:
+        to_visit = candidates
+    else:
+        planned = set()
+        for requirements in payload["requirements"]:
+            planned.update(plan_enrichment(candidates, requirements, site.matches_requirements, len(candidates)))
+        to_visit = [candidates[i] for i in sorted(planned)]
+
+    results = []
+    for product in candidates:
+        product_id = extract_product_id(product["link"])
+        results.append((product_key("listing", site.SITE, product_id), "listing", product))
+    follow_ups = []
+    for product in to_visit:
+        product_id = extract_product_id(product["link"])
+        follow_ups.append((product_key("detail", site.SITE, product_id), "detail", site.SITE, {"product": product}))
+    if has_next and payload["page"] < payload["max_pages"]:
+        next_page = dict(payload, page=payload["page"] + 1)
+        next_key = search_task_key(site.SITE, payload["query"], next_page["page"], payload["requirements"])
+        follow_ups.append((next_key, "search", site.SITE, next_page))
+    return results, follow_ups
+
+def run_detail_task(site, session, task):
+    """Visit a product page and store the product with its page specs."""
+    product = dict(task["payload"]["product"])
+    product["specifications"] = site.fetch_product_specs(session, product)
+    product_id = extract_product_id(product["link"])
+    return [(product_key("product", site.SITE, product_id), "product", product)], []
+
+TASK_HANDLERS = {
+    "search": run_search_task,
+    "detail": run_detail_task,
+}
+
+def run_worker(queue_path, worker_id, idle_timeout=None):
+    """Pull and run tasks until no task is pending or leased.
+
+    Tasks leased by a crashed worker are waited for until their lease
+    expires. With idle_timeout set, the worker also stops after that many
+    seconds without a task.
+    """
+    queue = CrawlQueue(queue_path)
+    sessions = {}
+    idle_since = time.time()
+    try:
+        while True:
+            task = queue.claim(worker_id)
+            if task is None:
+                if queue.unfinished() == 0 or (idle_timeout and time.time() - idle_since > idle_timeout):
+                    break
+                time.sleep(0.5)
+                continue
+            idle_since = time.time()
+
+            site = SITES[task["site"]]
+            if task["site"] not in sessions:
+                sessions[task["site"]] = BrowserSession(site.USER_AGENTS)
+            print(f"[{worker_id}] Running {task['key']} (attempt {task['attempts']})")
+            try:
+                results, follow_ups = TASK_HANDLERS[task["kind"]](site, sessions[task["site"]], task)
+            except Exception as e:
+                print(f"[{worker_id}] Task {task['key']} failed: {e}")
+                queue.fail(task, worker_id, e)
+                continue
+            if not queue.complete(task, worker_id, results, follow_ups):
+                print(f"[{worker_id}] Lost the lease on {task['key']}, result discarded")
+    finally:
+        for session in sessions.values():
+            session.close()
+        queue.close()
+
+def run_crawl(queue_path, jobs, workers=4, max_pages=5, max_restarts=2):
+    """Queue the jobs and crawl them with a pool of worker processes.
+
+    If every worker exits while tasks are still pending or leased, e.g.
+    because they crashed, a new pool is started, at most max_restarts times.
+    Raises RuntimeError if tasks are still unfinished after that.
+    """
+    queue = CrawlQueue(queue_path)
+    enqueue_crawl(queue, jobs, max_pages)
+
+    for round_number in range(max_restarts + 1):
+        if round_number:
+            print(f"Workers exited with {queue.unfinished()} tasks unfinished, restarting them")
+        processes = []
+        for i in range(workers):
+            process = multiprocessing.Process(target=run_worker, args=(queue_path, f"worker-{round_number}-{i}"))
+            process.start()
+            processes.append(process)
+        for process in processes:
+            process.join()
+        if queue.unfinished() == 0:
+            break
+
+    print(f"Crawl finished: {queue.counts()}")
+    for task in queue.dead_letters():
+        print(f"Dead task {task['key']}: {task['last_error']}")
+    unfinished = queue.unfinished()
+    products = collect_products(queue)
+    queue.close()
+    if unfinished:
+        raise RuntimeError(f"Crawl stopped with {unfinished} tasks unfinished, run it again to resume")
+    return products
+
+def collect_products(queue):
+    """Listings from the store, with product page specs where they were fetched."""
+    detailed = {}
+    for product in queue.results("product"):
+        detailed[(product["site"], extract_product_id(product["link"]))] = product
+    products = []
+    for listing in queue.results("listing"):
+        products.append(detailed.get((listing["site"], extract_product_id(listing["link"])), listing))
+    return products
+
+if __name__ == "__main__":
+    jobs = [
+        ("Amazon", "laptop with i5 processor 16GB RAM", None),
+        ("Flipkart", "laptop with i5 processor 16GB RAM", None),
+        ("Amazon", "laptop with i7 processor 16GB RAM 1TB SSD", None),
+        ("Flipkart", "laptop with i7 processor 16GB RAM 1TB SSD", None),
+    ]
+
+    os.makedirs("data", exist_ok=True)
+    products = run_crawl("data/crawl_queue.sqlite", jobs, workers=4, max_pages=5)
+    print(f"Collected {len(products)} products")
+    # Listings are keyed by product ID already, so the store drops nothing here
+    ResultStore("data/crawl_results.lrs").write(products)
+    PriceHistory().record(products)
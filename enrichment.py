@@ -0,0 +1,40 @@
+from combine_and_recommend import compute_score
+
+def unknown_required_fields(specs, requirements):
+    """Return the required spec keys that are still N/A in the specs.
+
+    Only keys of the specs schema count. Other requirement keys, like
+    max_price, are never filled in by a product page.
+    """
+    return [key for key in requirements if specs.get(key) == "N/A"]
+
+def could_match(product, requirements, matches):
+    """Check if a product can still match once its unknown required fields are known."""
+    optimistic_specs = dict(product["specifications"])
+    for key in unknown_required_fields(optimistic_specs, requirements):
+        # The required value always satisfies its own check
+        optimistic_specs[key] = str(requirements[key])
+    # A logged verdict would be misleading for a made-up product
+    return matches(dict(product, specifications=optimistic_specs), requirements, verbose=False)
+
+def plan_enrichment(candidates, requirements, matches, budget):
+    """Pick the candidates worth a detail-page visit, best expected score first.
+
+    A visit is only useful when a required field is still unknown after parsing
+    the name and the listing passes every check on the fields that are known.
+    matches is a site's matches_requirements, called with verbose=False.
+    Returns indices into candidates, at most budget of them.
+    """
+    if budget <= 0:
+        return []
+
+    worth_visiting = []
+    for index, product in enumerate(candidates):
+        if not unknown_required_fields(product["specifications"], requirements):
+            continue  # Name already decides the match
+        if not could_match(product, requirements, matches):
+            continue  # Fails on known fields, a visit cannot save it
+        worth_visiting.append(index)
+
+    worth_visiting.sort(key=lambda i: compute_score(candidates[i]), reverse=True)
+    return worth_visiting[:budget]
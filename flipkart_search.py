@@ -1,9 +1,13 @@
-from playwright.sync_api import sync_playwright
 import re
-import random
-import time
 import json
 import os
+from browser_session import BrowserSession
+from enrichment import plan_enrichment
+from listing_cache import ListingCache
+from price_history import PriceHistory
+from result_store import ResultStore
+
+SITE = "Flipkart"
 
 # List of user agents to rotate
 USER_AGENTS = [
@@ -112,8 +116,78 @@ def extract_specs_from_name(name, link=""):
     print(f"Extracted specs from name '{name}': {specs}")
     return specs
 
-def matches_requirements(product, requirements):
-    """Check if a product matches the customer's requirements with debug logging."""
+def extract_specs_from_page(page, product_name, link="", session=None):
+    """Extract structured specs from the Flipkart product page's specification tables.
+
+    A BrowserSession, when given, supplies the timeouts.
+    """
+    specs = extract_specs_from_name(product_name, link)  # Start with specs from name
+    timeout = session.timeout if session else (lambda milliseconds: milliseconds)
+
+    try:
+        page.wait_for_load_state("domcontentloaded", timeout=timeout(60000))
+        page.wait_for_selector("table tr", timeout=timeout(20000), state="attached")
+    except Exception as e:
+        print(f"Timeout waiting for specifications on page {page.url}: {e}")
+        return specs
+
+    for row in page.query_selector_all("table tr"):
+        try:
+            cells = row.query_selector_all("td")
+            if len(cells) < 2:
+                continue
+            label = cells[0].text_content().strip().lower()
+            value = cells[1].text_content().strip()
+        except Exception:
+            continue
+
+        if label == "processor name" or label == "processor variant":
+            if specs["processor"] == "N/A" or label == "processor name":
+                specs["processor"] = value.lower()
+        elif label == "ram":
+            ram_match = re.search(r"(\d+)\s*gb", value, re.IGNORECASE)
+            if ram_match:
+                specs["ram"] = ram_match.group(1) + "GB"
+        elif label == "ssd capacity" or (label == "hdd capacity" and specs["ssd"] == "N/A"):
+            ssd_match = re.search(r"(\d+)\s*(gb|tb)", value, re.IGNORECASE)
+            if ssd_match:
+                specs["ssd"] = ssd_match.group(1) + ssd_match.group(2).upper()
+        elif label == "screen size":
+            display_match = re.search(r"(\d+\.?\d*)\s*(?:inch|cm)", value, re.IGNORECASE)
+            if display_match:
+                size = float(display_match.group(1))
+                if "cm" in display_match.group(0).lower():
+                    size = round(size / 2.54, 1)  # Convert cm to inches
+                specs["display_size"] = f"{size} inch"
+        elif label == "graphic processor":
+            specs["gpu"] = value
+        elif label == "operating system":
+            os_match = re.search(r"(windows(?:\s*\d+)?|mac\s*os|jioos|chrome)", value, re.IGNORECASE)
+            if os_match:
+                specs["os"] = os_match.group(1).lower()
+        elif label == "weight":
+            weight_match = re.search(r"(\d+\.?\d*)\s*kg", value, re.IGNORECASE)
+            if weight_match:
+                specs["weight"] = weight_match.group(1) + " kg"
+        elif label == "battery backup":
+            battery_match = re.search(r"(\d+)\s*hours?", value, re.IGNORECASE)
+            if battery_match:
+                specs["battery"] = battery_match.group(1) + " Hours"
+        elif label == "refresh rate":
+            refresh_match = re.search(r"(\d+)\s*hz", value, re.IGNORECASE)
+            if refresh_match:
+                specs["refresh_rate"] = refresh_match.group(1) + " Hz"
+        elif label == "screen resolution" or label == "screen type":
+            resolution_match = re.search(r"(fhd|wuxga|qhd|2k|4k|\d+\s*x\s*\d+)", value, re.IGNORECASE)
+            if resolution_match and (specs["resolution"] == "N/A" or label == "screen resolution"):
+                specs["resolution"] = resolution_match.group(1).upper().replace(" ", "")
+
+    print(f"Extracted specs from page '{product_name}': {specs}")
+    return specs
+
+def matches_requirements(product, requirements, verbose=True):
+    """Check if a product matches the customer's requirements, logging the verdict if verbose."""
+    log = print if verbose else (lambda message: None)
     specs = product["specifications"]
     price = product["price"]
 
@@ -121,10 +195,10 @@ def matches_requirements(product, requirements):
     try:
         price_value = float(price.replace("₹", "").replace(",", ""))
         if "max_price" in requirements and price_value > requirements["max_price"]:
-            print(f"Product '{product['name']}' rejected: Price {price_value} exceeds max_price {requirements['max_price']}")
+            log(f"Product '{product['name']}' rejected: Price {price_value} exceeds max_price {requirements['max_price']}")
             return False
     except (ValueError, AttributeError):
-        print(f"Product '{product['name']}' rejected: Unable to parse price '{price}'")
+        log(f"Product '{product['name']}' rejected: Unable to parse price '{price}'")
         return False
 
     # Check critical specs (processor, ram, ssd)
@@ -133,21 +207,21 @@ def matches_requirements(product, requirements):
         if key not in requirements:
             continue
         if key not in specs or specs[key] == "N/A":
-            print(f"Product '{product['name']}' rejected: {key} is N/A")
+            log(f"Product '{product['name']}' rejected: {key} is N/A")
             return False
         product_value = specs[key].lower()
         required_value = str(requirements[key]).lower()
 
         if key == "processor":
             if required_value not in product_value:
-                print(f"Product '{product['name']}' rejected: {key} '{product_value}' does not contain '{required_value}'")
+                log(f"Product '{product['name']}' rejected: {key} '{product_value}' does not contain '{required_value}'")
                 return False
         elif key == "ram" or key == "ssd":
             try:
                 product_match = re.search(r"(\d+)\s*(gb|tb)", product_value, re.IGNORECASE)
                 required_match = re.search(r"(\d+)\s*(gb|tb)", required_value, re.IGNORECASE)
                 if not product_match or not required_match:
-                    print(f"Product '{product['name']}' rejected: Failed to parse {key} - product: '{product_value}', required: '{required_value}'")
+                    log(f"Product '{product['name']}' rejected: Failed to parse {key} - product: '{product_value}', required: '{required_value}'")
                     return False
                 product_num = float(product_match.group(1))
                 required_num = float(required_match.group(1))
@@ -158,10 +232,10 @@ def matches_requirements(product, requirements):
                 if required_unit == "TB":
                     required_num *= 1000
                 if product_num < required_num:
-                    print(f"Product '{product['name']}' rejected: {key} {product_num}GB is less than required {required_num}GB")
+                    log(f"Product '{product['name']}' rejected: {key} {product_num}GB is less than required {required_num}GB")
                     return False
             except (AttributeError, ValueError):
-                print(f"Product '{product['name']}' rejected: Failed to compare {key} - product: '{product_value}', required: '{required_value}'")
+                log(f"Product '{product['name']}' rejected: Failed to compare {key} - product: '{product_value}', required: '{required_value}'")
                 return False
 
     # Check non-critical specs (e.g., weight, gpu, os, resolution)
@@ -178,115 +252,166 @@ def matches_requirements(product, requirements):
                 product_num = float(re.search(r"\d+\.?\d*", product_value).group())
                 required_num = float(re.search(r"\d+\.?\d*", required_value).group())
                 if product_num > required_num:
-                    print(f"Product '{product['name']}' rejected: {key} {product_num} kg exceeds required {required_num} kg")
+                    log(f"Product '{product['name']}' rejected: {key} {product_num} kg exceeds required {required_num} kg")
                     return False
             except (AttributeError, ValueError):
-                print(f"Product '{product['name']}' rejected: Failed to compare {key} - product: '{product_value}', required: '{required_value}'")
+                log(f"Product '{product['name']}' rejected: Failed to compare {key} - product: '{product_value}', required: '{required_value}'")
                 return False
         elif key == "gpu" or key == "os" or key == "resolution":
             if required_value not in product_value:
-                print(f"Product '{product['name']}' rejected: {key} '{product_value}' does not contain '{required_value}'")
+                log(f"Product '{product['name']}' rejected: {key} '{product_value}' does not contain '{required_value}'")
                 return False
 
-    print(f"Product '{product['name']}' accepted")
+    log(f"Product '{product['name']}' accepted")
     return True
 
-def search_flipkart(query, requirements, max_results=10, max_pages=5):
-    """Search Flipkart for products based on the query and filter by requirements."""
+def parse_search_results(page):
+    """Collect raw listing records from a loaded search results page.
+
+    Returns the records and whether there is a next results page.
+    """
+    items = page.query_selector_all("div.KzDlHZ, div.tUxRFH")
+    records = []
+    for item in items:
+        try:
+            name_element = item.query_selector("div.KzDlHZ, a.IRpwTa")
+            price_element = item.query_selector("div.Nx9bqj, div.yRaYxA")
+            rating_element = item.query_selector("div.XQDdHH, span.sGWbFc")
+            link_element = item.query_selector("a.CGtC98, a.IRpwTa")
+
+            name = name_element.text_content().strip() if name_element else "N/A"
+            price = price_element.text_content().strip() if price_element else "N/A"
+            rating = rating_element.text_content().strip() if rating_element else "N/A"
+            link = link_element.get_attribute("href") if link_element else "N/A"
+
+            if name == "N/A" or "page" in name.lower():
+                continue
+
+            if link != "N/A":
+                link = link if link.startswith("https://") else f"https://www.flipkart.com{link}"
+
+            records.append({
+                "name": name,
+                "price": price,
+                "rating": rating,
+                "link": link
+            })
+
+        except Exception as e:
+            print(f"Error processing item: {e}")
+            continue
+
+    has_next = bool(page.query_selector("a._9QVEpD span:has-text('Next')"))
+    return records, has_next
+
+def fetch_product_specs(session, product):
+    """Visit a product page and return its specs, falling back to the listing's specs."""
+    try:
+        product_page = session.new_page()
+        product_page.goto(product["link"], timeout=session.timeout(30000))
+        product_page.wait_for_load_state("domcontentloaded")
+        specs = extract_specs_from_page(product_page, product["name"], product["link"], session=session)
+        product_page.close()
+        session.pause(1, 3)
+        return specs
+    except Exception as e:
+        print(f"Failed to scrape product page for {product['name']}: {e}. Using specs from name.")
+        return product["specifications"]
+
+def load_search_page(session, query, page_number, cache=None):
+    """Return (records, has_next, cached) for a results page, or None if it failed to load."""
+    cached = cache.get(SITE, query, page_number) if cache else None
+    if cached:
+        print(f"Using cached results for page {page_number} of '{query}'")
+        return cached[0], cached[1], True
+
+    try:
+        page = session.page
+        search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '+')}&page={page_number}"
+        print(f"Scraping page {page_number}: {search_url}")
+        page.goto(search_url, timeout=session.timeout(30000))
+        page.wait_for_load_state("domcontentloaded")
+        session.wait(page, 5000)
+    except Exception as e:
+        print(f"Failed to load search page {page_number} for query '{query}': {e}")
+        return None
+
+    records, has_next = parse_search_results(page)
+    if cache:
+        cache.put(SITE, query, page_number, records, has_next)
+    return records, has_next, False
+
+def build_candidates(records, query, seen_names):
+    """Turn raw listing records into products with specs parsed from their names and links."""
+    candidates = []
+    for data in records:
+        if "laptop" in query.lower() and ("desktop" in data["name"].lower() or "computer pc" in data["name"].lower()):
+            print(f"Skipping desktop product: {data['name']}")
+            continue
+
+        if data["name"] in seen_names:
+            continue
+        seen_names.add(data["name"])
+
+        if not data["link"].startswith("https://www.flipkart.com") or "#" in data["link"]:
+            print(f"Skipping malformed link for {data['name']}: {data['link']}")
+            continue
+
+        # Extract specs from both name and link
+        detailed_specs = extract_specs_from_name(data["name"], data["link"])
+
+        candidates.append({
+            "site": SITE,
+            "category": "laptop" if "laptop" in query.lower() else "phone",
+            "name": data["name"],
+            "price": data["price"],
+            "rating": data["rating"],
+            "link": data["link"],
+            "specifications": detailed_specs
+        })
+    return candidates
+
+def search_flipkart(query, requirements, max_results=10, max_pages=5, max_detail_visits=6, cache=None, archive=None):
+    """Search Flipkart for products based on the query and filter by requirements.
+
+    At most max_detail_visits product pages are visited per query. Results
+    pages found in cache (a ListingCache) are reused without opening a browser.
+    With a NetworkArchive, the session is recorded or replayed.
+    """
     products = []
     seen_names = set()
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        user_agent = random.choice(USER_AGENTS)
-        context = browser.new_context(
-            user_agent=user_agent,
-            viewport={"width": 1280, "height": 720}
-        )
-        page = context.new_page()
-
+    detail_visits = 0
+    with BrowserSession(USER_AGENTS, archive=archive) as session:
         current_page = 1
         while current_page <= max_pages and len(products) < max_results:
-            try:
-                search_url = f"https://www.flipkart.com/search?q={query.replace(' ', '+')}&page={current_page}"
-                print(f"Scraping page {current_page}: {search_url}")
-                page.goto(search_url, timeout=30000)
-                page.wait_for_load_state("domcontentloaded")
-                page.wait_for_timeout(5000)
-            except Exception as e:
-                print(f"Failed to load search page {current_page} for query '{query}': {e}")
+            loaded = load_search_page(session, query, current_page, cache)
+            if loaded is None:
                 break
+            records, has_next, cached = loaded
 
-            items = page.query_selector_all("div.KzDlHZ, div.tUxRFH")
-            product_data = []
-            for item in items:
-                try:
-                    name_element = item.query_selector("div.KzDlHZ, a.IRpwTa")
-                    price_element = item.query_selector("div.Nx9bqj, div.yRaYxA")
-                    rating_element = item.query_selector("div.XQDdHH, span.sGWbFc")
-                    link_element = item.query_selector("a.CGtC98, a.IRpwTa")
-
-                    name = name_element.text_content().strip() if name_element else "N/A"
-                    price = price_element.text_content().strip() if price_element else "N/A"
-                    rating = rating_element.text_content().strip() if rating_element else "N/A"
-                    link = link_element.get_attribute("href") if link_element else "N/A"
-
-                    if name == "N/A" or "page" in name.lower():
-                        continue
-
-                    if "laptop" in query.lower() and ("desktop" in name.lower() or "computer pc" in name.lower()):
-                        print(f"Skipping desktop product: {name}")
-                        continue
-
-                    if name in seen_names:
-                        continue
-                    seen_names.add(name)
-
-                    if link != "N/A":
-                        link = link if link.startswith("https://") else f"https://www.flipkart.com{link}"
-
-                    product_data.append({
-                        "name": name,
-                        "price": price,
-                        "rating": rating,
-                        "link": link
-                    })
-
-                except Exception as e:
-                    print(f"Error processing item: {e}")
-                    continue
-
-            for data in product_data:
-                if len(products) >= max_results:
-                    break
-
-                if not data["link"].startswith("https://www.flipkart.com") or "#" in data["link"]:
-                    print(f"Skipping malformed link for {data['name']}: {data['link']}")
-                    continue
-
-                # Extract specs from both name and link
-                detailed_specs = extract_specs_from_name(data["name"], data["link"])
+            candidates = build_candidates(records, query, seen_names)
 
-                product = {
-                    "site": "Flipkart",
-                    "category": "laptop" if "laptop" in query.lower() else "phone",
-                    "name": data["name"],
-                    "price": data["price"],
-                    "rating": data["rating"],
-                    "link": data["link"],
-                    "specifications": detailed_specs
-                }
+            # Visit product pages only where a required field is unknown and could decide the match
+            visits = set(plan_enrichment(candidates, requirements, matches_requirements, max_detail_visits - detail_visits))
 
+            # Visit planned pages only while results are still needed
+            for index, product in enumerate(candidates):
+                if len(products) >= max_results:
+                    break
+                if index in visits:
+                    detail_visits += 1
+                    product["specifications"] = fetch_product_specs(session, product)
                 if matches_requirements(product, requirements):
                     products.append(product)
 
             current_page += 1
-            next_page_button = page.query_selector("a._9QVEpD span:has-text('Next')")
-            if not next_page_button:
+            if not has_next:
                 break
-            time.sleep(random.uniform(2, 4))
+            if not cached:
+                session.pause(2, 4)
 
-        context.close()
-        browser.close()
+    if cache:
+        cache.save()
 
     products.sort(key=lambda x: float(x["price"].replace("₹", "").replace(",", "")) if x["price"] != "N/A" else float("inf"))
     return products
@@ -301,11 +426,15 @@ if __name__ == "__main__":
     }
 
     print(f"Searching for: {customer_query}")
-    results = search_flipkart(customer_query, requirements, max_results=10, max_pages=5)
+    cache = ListingCache("data/listing_cache.json")
+    results = search_flipkart(customer_query, requirements, max_results=10, max_pages=5, cache=cache)
     print(f"Found {len(results)} matching products:")
     for product in results:
         print(json.dumps(product, indent=2))
 
     os.makedirs("data", exist_ok=True)
-    with open("data/flipkart_results.json", "w") as f:
-        json.dump(results, f, indent=2)
\ No newline at end of file
+    # The store keeps one copy per product ID, repeated listings of a pid are stored once
+    ResultStore("data/flipkart_results.lrs").write(results)
+
+    # Keep the price movement of every result
+    PriceHistory().record(results)
\ No newline at end of file
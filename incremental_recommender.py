@@ -0,0 +1,154 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from itertools import islice
+from combine_and_recommend import categorize_laptop, compute_score, dedupe_key, normalize_os
+from product_ids import extract_product_id
+
+class IncrementalRecommender:
+    """Keeps the recommended products up to date as listings are added, repriced or removed.
+
+    Listings are deduplicated by name like deduplicate_products: the first
+    listing of a name is active, later ones are kept in reserve and take over
+    if it is removed. Active listings sit in one score-ordered list per
+    category, so an update is a binary search plus a list insert or delete,
+    and the recommendations are read off the heads of those lists. The
+    insert or delete shifts the tail of the list, so an update is O(n) in
+    the worst case, but that is a single memmove, much cheaper than
+    rescoring and resorting the catalog. Listeners are called when the
+    recommendations change.
+    """
+
+    def __init__(self, top_n=5, history=None):
+        self.top_n = top_n
+        self.history = history
+        self.products = {}  # Product ID -> product
+        self.keys = {}  # Product ID -> dedupe key
+        self.groups = {}  # Dedupe key -> product IDs in arrival order, first is active
+        self.entries = {}  # Active product ID -> (category, (-score, seq, product ID))
+        self.ranked = {}  # Category -> sorted (-score, seq, product ID) entries
+        self.sequence = {}  # Product ID -> arrival number, breaks score ties like catalog order
+        self.next_sequence = 0
+        self.listeners = []
+        self.current = []  # Recommended product IDs
+
+    def on_change(self, callback):
+        """Call callback(event) whenever the recommendation list changes.
+
+        The event holds the added and removed product IDs and the new list.
+        """
+        self.listeners.append(callback)
+
+    def _activate(self, product_id):
+        product = self.products[product_id]
+        category = categorize_laptop(product["specifications"])
+        entry = (-compute_score(product, self.history), self.sequence[product_id], product_id)
+        self.entries[product_id] = (category, entry)
+        insort(self.ranked.setdefault(category, []), entry)
+
+    def _deactivate(self, product_id):
+        category, entry = self.entries.pop(product_id)
+        ranked = self.ranked[category]
+        del ranked[bisect_left(ranked, entry)]
+        if not ranked:
+            del self.ranked[category]
+
+    def _leave_group(self, product_id):
+        key = self.keys.pop(product_id)
+        group = self.groups[key]
+        was_active = group[0] == product_id
+        group.remove(product_id)
+        if was_active:
+            self._deactivate(product_id)
+            if group:
+                self._activate(group[0])  # Next listing with the same name takes over
+        if not group:
+            del self.groups[key]
+
+    def _join_group(self, product_id):
+        key = dedupe_key(self.products[product_id])
+        self.keys[product_id] = key
+        group = self.groups.setdefault(key, [])
+        # Keep arrival order, a renamed listing may predate the group's active one
+        position = bisect_left([self.sequence[other] for other in group], self.sequence[product_id])
+        group.insert(position, product_id)
+        if position == 0:
+            if len(group) > 1:
+                self._deactivate(group[1])
+            self._activate(product_id)
+
+    def upsert(self, listing):
+        """Add a listing or update a known one, e.g. after a price change. Returns its product ID."""
+        product_id = extract_product_id(listing["link"])
+        specs = dict(listing["specifications"])
+        # Normalize OS
+        specs["os"] = normalize_os(specs.get("os", "N/A"))
+        product = dict(listing, specifications=specs)
+
+        if product_id in self.products:
+            self.products[product_id] = product
+            if self.keys[product_id] != dedupe_key(product):
+                self._leave_group(product_id)
+                self._join_group(product_id)
+            elif product_id in self.entries:
+                # Re-rank with the new price, rating or specs
+                self._deactivate(product_id)
+                self._activate(product_id)
+        else:
+            self.sequence[product_id] = self.next_sequence
+            self.next_sequence += 1
+            self.products[product_id] = product
+            self._join_group(product_id)
+
+        self._refresh()
+        return product_id
+
+    def remove(self, product_id):
+        """Drop a listing. Returns False if it was not known."""
+        if product_id not in self.products:
+            return False
+        self._leave_group(product_id)
+        del self.products[product_id]
+        del self.sequence[product_id]
+        self._refresh()
+        return True
+
+    def _select(self):
+        """Same picks as select_recommendations over the full catalog, read from the category lists."""
+        leaders = sorted(ranked[0] for ranked in self.ranked.values())
+        if self.top_n <= len(leaders):
+            return [product_id for _, _, product_id in leaders[:self.top_n]]
+        selected = list(leaders)
+
+        # Once every category is covered, the products ranked below the last leader follow
+        wanted = self.top_n - len(selected)
+        after = []
+        for ranked in self.ranked.values():
+            start = bisect_right(ranked, leaders[-1])
+            after.append(ranked[start:start + wanted])
+        selected += islice(merge(*after), wanted)
+
+        # Fill with the highest-scored products that were skipped
+        if len(selected) < self.top_n:
+            chosen = set(selected)
+            # At most top_n products of a category are selected, so the top 2 * top_n cover the fill
+            remaining = merge(*(ranked[:2 * self.top_n] for ranked in self.ranked.values()))
+            selected += islice((entry for entry in remaining if entry not in chosen), self.top_n - len(selected))
+        return [product_id for _, _, product_id in selected]
+
+    def _refresh(self):
+        recommended = self._select()
+        if recommended == self.current:
+            return
+
+        event = {
+            "added": [product_id for product_id in recommended if product_id not in self.current],
+            "removed": [product_id for product_id in self.current if product_id not in recommended],
+        }
+        self.current = recommended
+        event["recommendations"] = self.recommendations()
+        for callback in self.listeners:
+            callback(event)
+
+    def recommendations(self):
+        """Current [product, category] pairs, in the shape combine_and_recommend returns."""
+        return [[self.products[product_id], self.entries[product_id][0]] for product_id in self.current]
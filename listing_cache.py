@@ -0,0 +1,90 @@
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+# Grammatical filler that does not change which listings a search returns.
+# Words naming a spec ("ram", "storage", ...) stay, "16gb ram" and "16gb storage" differ.
+STOPWORDS = {
+    "a", "an", "and", "the", "with", "for", "of", "in", "on", "to", "having",
+}
+
+def normalize_query(query):
+    """Normalize a search query so equivalent phrasings share a cache key.
+
+    Tokens are case-folded, stripped of stopwords and sorted, and sizes such
+    as "16 GB" are joined into "16gb".
+    """
+    text = query.casefold()
+    text = re.sub(r"(\d+)\s+(gb|tb|inch|hz)\b", r"\1\2", text)
+    tokens = re.findall(r"[\w.]+", text)
+    return " ".join(sorted(token for token in tokens if token not in STOPWORDS))
+
+class ListingCache:
+    """Bounded, expiring cache of raw search-result records.
+
+    Entries are keyed on (site, normalized query, page) and hold the listing
+    records scraped from that results page, before any requirement filtering.
+    """
+
+    def __init__(self, path=None, ttl=6 * 3600, max_entries=500):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = OrderedDict(json.load(f))
+            except (ValueError, OSError) as e:
+                print(f"Ignoring unreadable listing cache {path}: {e}")
+            self._evict()
+
+    @staticmethod
+    def key(site, query, page):
+        return f"{site.lower()}|{normalize_query(query)}|{page}"
+
+    def get(self, site, query, page):
+        """Return (records, has_next) for a results page, or None on a miss."""
+        key = self.key(site, query, page)
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["stored_at"] > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry["records"], entry["has_next"]
+
+    def put(self, site, query, page, records, has_next):
+        """Store the raw records of a results page.
+
+        Pages without records are not stored. A captcha or block page parses
+        to nothing, and caching it would hide real results until it expired.
+        """
+        if not records:
+            return
+        key = self.key(site, query, page)
+        self.entries[key] = {
+            "stored_at": time.time(),
+            "records": records,
+            "has_next": has_next
+        }
+        self.entries.move_to_end(key)
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key in [k for k, entry in self.entries.items() if now - entry["stored_at"] > self.ttl]:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)  # Least recently used
+
+    def save(self):
+        """Write the cache to its file, if it has one."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
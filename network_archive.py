@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import zlib
+
+# Resource types worth keeping; images, media and fonts do not affect parsing
+RECORDED_TYPES = {"document", "xhr", "fetch", "script", "stylesheet"}
+# Headers that describe the transfer rather than the stored body
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+class NetworkArchive:
+    """Content-addressed archive of the responses a scrape session fetched.
+
+    In record mode every response of a recorded resource type is saved while
+    the scrape runs live. In replay mode the same requests are answered from
+    the archive through Playwright routing and everything else is aborted, so
+    a session re-runs without network access. Bodies are stored once per
+    content hash under blobs/, shared by all sessions in the directory, and
+    each session has its own index of (method, url) -> response.
+    """
+
+    def __init__(self, directory, session="default", mode="replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown archive mode '{mode}'")
+        self.directory = directory
+        self.session = session
+        self.mode = mode
+        self.blob_dir = os.path.join(directory, "blobs")
+        self.index_path = os.path.join(directory, "sessions", f"{session}.jsonl")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+
+        self.responses = {}  # (method, url) -> recorded responses in fetch order
+        self.served = {}  # (method, url) -> number of times served during replay
+        if mode == "record":
+            open(self.index_path, "w").close()  # Start the session afresh
+        elif not os.path.exists(self.index_path):
+            raise FileNotFoundError(f"No recorded session at {self.index_path}")
+        else:
+            with open(self.index_path, "r") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.responses.setdefault((entry["method"], entry["url"]), []).append(entry)
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def store_body(self, body):
+        """Save a response body once per content hash. Returns the hash."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(zlib.compress(body))
+            os.replace(temp_path, path)
+        return digest
+
+    def load_body(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def attach(self, context):
+        """Route all requests of a browser context through the archive."""
+        context.route("**/*", self._record if self.mode == "record" else self._replay)
+
+    def _record(self, route):
+        request = route.request
+        if request.resource_type not in RECORDED_TYPES:
+            route.continue_()
+            return
+        try:
+            response = route.fetch()
+            body = response.body()
+        except Exception as e:
+            # Fail the request like the network would, so the scraper's own error handling runs
+            print(f"Recording {request.url} failed: {e}")
+            route.abort()
+            return
+        entry = {
+            "method": request.method,
+            "url": request.url,
+            "status": response.status,
+            "headers": {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+            "body": self.store_body(body)
+        }
+        with open(self.index_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.responses.setdefault((entry["method"], entry["url"]), []).append(entry)
+        route.fulfill(response=response, body=body)
+
+    def _replay(self, route):
+        request = route.request
+        key = (request.method, request.url)
+        recorded = self.responses.get(key)
+        if not recorded:
+            route.abort()
+            return
+        # Repeated requests (reloads, retries) get the recorded responses in order
+        count = self.served.get(key, 0)
+        self.served[key] = count + 1
+        entry = recorded[min(count, len(recorded) - 1)]
+        route.fulfill(status=entry["status"], headers=entry["headers"], body=self.load_body(entry["body"]))
@@ -0,0 +1,261 @@
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from statistics import median
+from combine_and_recommend import parse_price, parse_rating
+from product_ids import extract_product_id
+
+MAGIC = b"LRHIST01"
+JOURNAL_RECORD = struct.Struct("<IIih")  # Product code, timestamp, price, rating x10
+NO_PRICE = -1
+NO_RATING = -1
+DAY = 86400
+
+def history_key(product):
+    """Key a product by site and product ID, so renamed listings keep their history."""
+    return f"{product['site']}|{extract_product_id(product['link'])}"
+
+class PriceHistory:
+    """Append-only price and rating history, keyed by product.
+
+    New observations are appended to a journal of fixed-size records.
+    compact() folds the journal into a segment file that holds, per product,
+    delta-encoded timestamp, price and rating arrays. Only points where the
+    price or rating changed are kept. The segment is memory-mapped, so reading
+    one product's series touches only its own slice of the file.
+
+    record() compacts on its own once the journal grows past journal_limit
+    bytes or its oldest point is journal_days old, keeping retention_days
+    of history.
+    """
+
+    def __init__(self, directory="data/price_history", retention_days=365, journal_limit=1 << 20, journal_days=7):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.journal_limit = journal_limit
+        self.journal_days = journal_days
+        os.makedirs(directory, exist_ok=True)
+        self.keys_path = os.path.join(directory, "products.json")
+        self.journal_path = os.path.join(directory, "journal.bin")
+        self.segment_path = os.path.join(directory, "history.bin")
+
+        self.keys = []
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r") as f:
+                self.keys = json.load(f)
+        self.codes = {key: code for code, key in enumerate(self.keys)}
+        self._segment = None
+        self._open_segment()
+        self._load_journal()
+
+    def files(self):
+        """Files holding the history, e.g. to invalidate snapshots built from it."""
+        return [self.keys_path, self.journal_path, self.segment_path]
+
+    def _open_segment(self):
+        self._segment = None
+        self._index = None
+        if not os.path.exists(self.segment_path) or os.path.getsize(self.segment_path) == 0:
+            return
+        with open(self.segment_path, "rb") as f:
+            self._segment = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._segment[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.segment_path} is not a price history segment")
+        (count,) = struct.unpack_from("<I", self._segment, len(MAGIC))
+        start = len(MAGIC) + 8
+        # Per product: byte offset of its arrays and number of points
+        self._offsets = memoryview(self._segment)[start:start + count * 8].cast("Q")
+        self._lengths = memoryview(self._segment)[start + count * 8:start + count * 12].cast("I")
+        self._index = count
+
+    def _load_journal(self):
+        self._journal = {}
+        self._journal_start = None  # Oldest journal timestamp
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            data = f.read()
+        usable = len(data) - len(data) % JOURNAL_RECORD.size  # Ignore a torn last record
+        for code, timestamp, price, rating in JOURNAL_RECORD.iter_unpack(data[:usable]):
+            self._journal.setdefault(code, []).append((timestamp, price, rating))
+            self._journal_start = min(timestamp, self._journal_start or timestamp)
+
+    def close(self):
+        if self._segment is not None:
+            self._offsets.release()
+            self._lengths.release()
+            self._segment.close()
+            self._segment = None
+
+    def _code(self, key):
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.keys)
+            self.keys.append(key)
+        return code
+
+    def _save_keys(self):
+        temp_path = self.keys_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.keys, f)
+        os.replace(temp_path, self.keys_path)
+
+    def record(self, products, timestamp=None):
+        """Append the current price and rating of each product."""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        records = []
+        for product in products:
+            price = parse_price(product)
+            rating = parse_rating(product)
+            code = self._code(history_key(product))
+            price_value = NO_PRICE if price == float("inf") else int(round(price))
+            rating_value = int(round(rating * 10)) if rating else NO_RATING
+            records.append((code, timestamp, price_value, rating_value))
+
+        self._save_keys()
+        with open(self.journal_path, "ab") as f:
+            for record in records:
+                f.write(JOURNAL_RECORD.pack(*record))
+        for code, *point in records:
+            self._journal.setdefault(code, []).append(tuple(point))
+        if records:
+            self._journal_start = min(timestamp, self._journal_start or timestamp)
+
+        journal_size = os.path.getsize(self.journal_path)
+        if journal_size > self.journal_limit or (records and timestamp - self._journal_start >= self.journal_days * DAY):
+            self.compact(self.retention_days, now=timestamp)
+
+    def _segment_series(self, code):
+        if self._segment is None or code >= self._index or self._lengths[code] == 0:
+            return []
+        offset = self._offsets[code]
+        n = self._lengths[code]
+        view = memoryview(self._segment)
+        times = accumulate(view[offset:offset + 4 * n].cast("I"))
+        prices = accumulate(view[offset + 4 * n:offset + 8 * n].cast("i"))
+        ratings = accumulate(view[offset + 8 * n:offset + 10 * n].cast("h"))
+        series = list(zip(times, prices, ratings))
+        view.release()
+        return series
+
+    def series(self, key, since=None):
+        """(timestamp, price, rating x10) points of a product, oldest first.
+
+        With since set, the last point before it is included as well, since
+        it holds the price that was in effect at that time.
+        """
+        code = self.codes.get(key)
+        if code is None:
+            return []
+        points = self._segment_series(code)
+        journal = sorted(self._journal.get(code, []))
+        if points:
+            # Skip journal points already folded in by an interrupted compaction
+            journal = [point for point in journal if point[0] > points[-1][0]]
+        points += journal
+        if since is not None:
+            times = [t for t, _, _ in points]
+            points = points[max(bisect_left(times, since) - 1, 0):]
+        return points
+
+    def _prices(self, key, days, now=None):
+        """Prices over the given number of days, one per price change.
+
+        Repeat observations of an unchanged price are collapsed, as compact()
+        does, so the answers are the same before and after compaction.
+        """
+        now = now if now is not None else time.time()
+        since = now - days * DAY if days is not None else None
+        prices = []
+        for _, price, _ in self.series(key, since):
+            if price != NO_PRICE and (not prices or prices[-1] != price):
+                prices.append(price)
+        return prices
+
+    def lowest_price(self, key, days=30, now=None):
+        """Lowest price over the given number of days, or None without history."""
+        prices = self._prices(key, days, now)
+        return min(prices) if prices else None
+
+    def median_price(self, key, days=90, now=None):
+        """Median of the prices held over the given number of days, or None without history."""
+        prices = self._prices(key, days, now)
+        return median(prices) if prices else None
+
+    def current_discount(self, key, days=90, now=None):
+        """How far the latest price is below the median, as a fraction of the median."""
+        prices = self._prices(key, days, now)
+        if not prices:
+            return None
+        typical = median(prices)
+        return (typical - prices[-1]) / typical if typical else None
+
+    def price_signals(self, product, now=None):
+        """Trend signals for a product, as used by compute_score."""
+        key = history_key(product)
+        price = parse_price(product)
+        prices = self._prices(key, 30, now)
+        # Prices held before the current one; a product whose price never moved has none
+        earlier = prices[:-1] if prices and prices[-1] == price else prices
+        return {
+            "lowest_30d": min(prices) if prices else None,
+            "at_30d_low": bool(earlier) and price < min(earlier),
+            "discount_vs_median": self.current_discount(key, 90, now)
+        }
+
+    def compact(self, retention_days=365, now=None):
+        """Fold the journal into the segment, dropping points past the retention window.
+
+        The newest point older than the window is kept so the price in effect
+        at the start of the window is still known.
+        """
+        now = now if now is not None else time.time()
+        cutoff = now - retention_days * DAY
+
+        columns = []
+        for code in range(len(self.keys)):
+            points = self.series(self.keys[code])
+            kept = []
+            for point in points:
+                if kept and kept[-1][1:] == point[1:]:
+                    continue  # Unchanged price and rating
+                kept.append(point)
+            times = [t for t, _, _ in kept]
+            kept = kept[max(bisect_right(times, cutoff) - 1, 0):]
+            columns.append(kept)
+
+        count = len(columns)
+        header = MAGIC + struct.pack("<II", count, 0)
+        position = len(header) + count * 12
+        position += (-position) % 8
+        offsets = array("Q")
+        lengths = array("I")
+        blocks = []
+        for kept in columns:
+            offsets.append(position)
+            lengths.append(len(kept))
+            block = b""
+            for column, typecode in zip(zip(*kept), "Iih") if kept else []:
+                deltas = array(typecode, [column[0]] + [b - a for a, b in zip(column, column[1:])])
+                block += deltas.tobytes()
+            block += b"\0" * ((-len(block)) % 8)
+            blocks.append(block)
+            position += len(block)
+
+        index = offsets.tobytes() + lengths.tobytes()
+        index += b"\0" * ((-(len(header) + len(index))) % 8)
+        temp_path = self.segment_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(header + index + b"".join(blocks))
+
+        self.close()
+        os.replace(temp_path, self.segment_path)
+        open(self.journal_path, "wb").close()
+        self._journal = {}
+        self._journal_start = None
+        self._open_segment()
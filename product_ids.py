@@ -0,0 +1,56 @@
+import re
+from urllib.parse import urlencode, urljoin, urlparse, urlunparse, parse_qs
+
+ASIN_PATTERN = re.compile(r"/(?:dp|gp/product)/([A-Z0-9]{10})")
+# Query parameters that identify the product, the rest only track the visit
+PRODUCT_PARAMS = ["pid"]
+
+def resolve_redirect(link):
+    """Return the product URL behind a redirect link, or the link itself.
+
+    Sponsored Amazon links (/sspa/click) carry the product URL encoded in
+    their url parameter, and every one of them shares the same path.
+    """
+    target = parse_qs(urlparse(link).query).get("url")
+    return urljoin(link, target[0]) if target else link
+
+def extract_product_id(link):
+    """Return a stable product ID for an Amazon or Flipkart product link.
+
+    Amazon links give their ASIN and Flipkart links their pid (or item ID).
+    Other links fall back to the URL without its query string.
+    """
+    if not link or link == "N/A":
+        return None
+
+    parsed = urlparse(resolve_redirect(link))
+    asin_match = ASIN_PATTERN.search(parsed.path)
+    if asin_match:
+        return asin_match.group(1)
+
+    pid = parse_qs(parsed.query).get("pid")
+    if pid:
+        return pid[0]
+    item_match = re.search(r"/p/(itm[0-9a-z]+)", parsed.path)
+    if item_match:
+        return item_match.group(1)
+
+    return f"{parsed.netloc}{parsed.path}"
+
+def canonical_link(link):
+    """Strip the tracking parts of a product link, keeping what identifies the product.
+
+    Amazon links become https://<host>/dp/<ASIN>, other links keep their path
+    and pid. The product ID of the stripped link is unchanged.
+    """
+    if not link or link == "N/A":
+        return link
+
+    parsed = urlparse(resolve_redirect(link))
+    asin_match = ASIN_PATTERN.search(parsed.path)
+    if asin_match and "amazon." in parsed.netloc:
+        return f"https://{parsed.netloc}/dp/{asin_match.group(1)}"
+
+    params = parse_qs(parsed.query)
+    query = urlencode([(name, params[name][0]) for name in PRODUCT_PARAMS if name in params])
+    return urlunparse((parsed.scheme, parsed.netloc, parsed.path, "", query, ""))
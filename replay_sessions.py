@@ -0,0 +1,50 @@
+import json
+import os
+import time
+import amazon_search
+import flipkart_search
+from network_archive import NetworkArchive
+
+SEARCHES = {
+    amazon_search.SITE: amazon_search.search_amazon,
+    flipkart_search.SITE: flipkart_search.search_flipkart,
+}
+
+def _meta_path(directory, session):
+    return os.path.join(directory, "sessions", f"{session}.meta.json")
+
+def record_search(directory, session, site, query, requirements, **options):
+    """Run a live search while recording every response into the archive."""
+    archive = NetworkArchive(directory, session, mode="record")
+    with open(_meta_path(directory, session), "w") as f:
+        json.dump({"site": site, "query": query, "requirements": requirements, "options": options}, f, indent=2)
+    return SEARCHES[site](query, requirements, archive=archive, **options)
+
+def replay_search(directory, session):
+    """Re-run a recorded search offline against the current parsing code."""
+    with open(_meta_path(directory, session), "r") as f:
+        meta = json.load(f)
+    archive = NetworkArchive(directory, session, mode="replay")
+    return SEARCHES[meta["site"]](meta["query"], meta["requirements"], archive=archive, **meta["options"])
+
+def replay_all(directory):
+    """Replay every recorded session in the archive, reporting result counts and timings."""
+    sessions_dir = os.path.join(directory, "sessions")
+    report = {}
+    for file_name in sorted(os.listdir(sessions_dir)):
+        if not file_name.endswith(".meta.json"):
+            continue
+        session = file_name[:-len(".meta.json")]
+        start = time.time()
+        results = replay_search(directory, session)
+        report[session] = {"results": len(results), "seconds": round(time.time() - start, 2)}
+        print(f"{session}: {len(results)} results in {report[session]['seconds']}s")
+    return report
+
+if __name__ == "__main__":
+    archive_dir = "data/network_archive"
+    session = "amazon-i5-16gb"
+    if not os.path.exists(_meta_path(archive_dir, session)):
+        record_search(archive_dir, session, "Amazon", "laptop with i5 processor 16GB RAM",
+                      {"processor": "i5", "ram": "16GB", "max_price": 150000}, max_results=10, max_pages=2)
+    replay_all(archive_dir)
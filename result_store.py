@@ -0,0 +1,148 @@
+import json
+import os
+import struct
+import zlib
+from product_ids import canonical_link, extract_product_id
+
+MAGIC = b"LRSTORE1"
+BLOCK_HEADER = struct.Struct("<IIII")  # Record count, index bytes, data bytes, CRC32 of the index
+BLOCK_RECORDS = 256
+
+def _encode_block(products):
+    """Compress products into a block. Returns (index, header and index bytes, data bytes).
+
+    The data is JSON lines, the index one [site, product ID, offset, length]
+    entry per line, each compressed on its own so the index can be read
+    without decompressing the data.
+    """
+    index = []
+    lines = []
+    offset = 0
+    for product in products:
+        product = dict(product, link=canonical_link(product.get("link")))
+        line = json.dumps(product, separators=(",", ":")).encode("utf-8")
+        index.append([product.get("site"), extract_product_id(product.get("link")), offset, len(line)])
+        lines.append(line)
+        offset += len(line) + 1
+    index_bytes = zlib.compress(json.dumps(index, separators=(",", ":")).encode("utf-8"))
+    data_bytes = zlib.compress(b"\n".join(lines), 9)
+    header = BLOCK_HEADER.pack(len(index), len(index_bytes), len(data_bytes), zlib.crc32(index_bytes))
+    return index, header + index_bytes, data_bytes
+
+class ResultStore:
+    """Append-only store of scraped products, compressed block by block.
+
+    Every block holds up to block_records products as zlib-compressed JSON
+    lines, preceded by its own small index of (site, product ID) -> line
+    offset. Opening the store reads only the block indexes, so one listing
+    is fetched by decompressing just its block. Appends add blocks at the
+    end, and a later copy of a product supersedes the earlier one. Links are
+    stored without their tracking parameters.
+    """
+
+    def __init__(self, path, block_records=BLOCK_RECORDS):
+        self.path = path
+        self.block_records = block_records
+        self.blocks = []  # (data offset, data length, index) per block
+        self.locations = {}  # (site, product ID) -> (block number, line number) of the latest copy
+        self.end = len(MAGIC)  # Where the next block goes
+        self._decoded = (None, None)  # Last decompressed block
+        if os.path.exists(path):
+            self._scan()
+
+    def _scan(self):
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a result store")
+            while self.end + BLOCK_HEADER.size <= size:
+                f.seek(self.end)
+                count, index_length, data_length, checksum = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+                data_offset = self.end + BLOCK_HEADER.size + index_length
+                if data_offset + data_length > size:
+                    break  # Torn by an interrupted append, the next append overwrites it
+                index_bytes = f.read(index_length)
+                if zlib.crc32(index_bytes) != checksum:
+                    break
+                self._add_block(data_offset, data_length, json.loads(zlib.decompress(index_bytes)))
+                self.end = data_offset + data_length
+
+    def _add_block(self, data_offset, data_length, index):
+        number = len(self.blocks)
+        self.blocks.append((data_offset, data_length, index))
+        for line, (site, product_id, _, _) in enumerate(index):
+            if product_id is not None:
+                self.locations[(site, product_id)] = (number, line)
+
+    def _read_block(self, number):
+        if self._decoded[0] != number:
+            data_offset, data_length, _ = self.blocks[number]
+            with open(self.path, "rb") as f:
+                f.seek(data_offset)
+                self._decoded = (number, zlib.decompress(f.read(data_length)))
+        return self._decoded[1]
+
+    def __len__(self):
+        return len(self.locations) + sum(1 for _, _, index in self.blocks for entry in index if entry[1] is None)
+
+    def get(self, site, product_id):
+        """Fetch one product by site and product ID, or None if it is not stored."""
+        location = self.locations.get((site, product_id))
+        if location is None:
+            return None
+        number, line = location
+        _, _, offset, length = self.blocks[number][2][line]
+        return json.loads(self._read_block(number)[offset:offset + length])
+
+    def records(self):
+        """All products, the latest copy of each, in the order they were appended."""
+        products = []
+        for number, (_, _, index) in enumerate(self.blocks):
+            data = self._read_block(number)
+            for line, (site, product_id, offset, length) in enumerate(index):
+                if product_id is None or self.locations[(site, product_id)] == (number, line):
+                    products.append(json.loads(data[offset:offset + length]))
+        return products
+
+    def append(self, products):
+        """Append products at the end of the store."""
+        products = list(products)
+        if not os.path.exists(self.path):
+            with open(self.path, "wb") as f:
+                f.write(MAGIC)
+        with open(self.path, "r+b") as f:
+            f.seek(self.end)
+            f.truncate()  # Drop a torn block left by an interrupted append
+            for start in range(0, len(products), self.block_records):
+                index, head, data = _encode_block(products[start:start + self.block_records])
+                f.write(head + data)
+                self._add_block(self.end + len(head), len(data), index)
+                self.end += len(head) + len(data)
+
+    def write(self, products):
+        """Replace the contents of the store with products.
+
+        Products sharing a site and product ID are stored as one, the last of them.
+        """
+        temp_path = self.path + ".tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        ResultStore(temp_path, self.block_records).append(products)
+        os.replace(temp_path, self.path)
+        self.__init__(self.path, self.block_records)
+
+    def compact(self):
+        """Rewrite the store without superseded copies."""
+        self.write(self.records())
+
+if __name__ == "__main__":
+    # Convert JSON results from earlier runs
+    for name in ["amazon_results", "flipkart_results", "crawl_results"]:
+        json_file = f"data/{name}.json"
+        if not os.path.exists(json_file):
+            continue
+        with open(json_file, "r") as f:
+            products = json.load(f)
+        store = ResultStore(f"data/{name}.lrs")
+        store.write(products)
+        print(f"{json_file}: {os.path.getsize(json_file)} bytes -> {store.path}: {os.path.getsize(store.path)} bytes, {len(store)} products")
@@ -0,0 +1,136 @@
+import multiprocessing
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from catalog_snapshot import CatalogSnapshot, build_snapshot
+from combine_and_recommend import build_catalog_entries, recommend_from_snapshot, results_file
+
+GENERATION = struct.Struct("<Q")
+
+def _attach(name):
+    """Attach to an existing segment without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python before 3.13 always registers attached segments with the
+        # resource tracker, which unlinks them when the process exits
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+class CatalogPublisher:
+    """Publishes catalog snapshots into shared memory, one segment per generation.
+
+    A small control segment holds the current generation number. Publishing
+    writes the new snapshot into its own segment and then bumps that number,
+    which switches every worker over at once. The previous keep generations
+    stay alive so workers still reading them are not cut off.
+    """
+
+    def __init__(self, name="laptop-catalog", keep=1):
+        self.name = name
+        self.keep = keep
+        self.control = shared_memory.SharedMemory(name=name, create=True, size=GENERATION.size)
+        GENERATION.pack_into(self.control.buf, 0, 0)
+        self.generation = 0
+        self.segments = {}  # Generation -> segment
+
+    def publish(self, snapshot_bytes):
+        """Publish a snapshot and make it current. Returns its generation."""
+        generation = self.generation + 1
+        segment = shared_memory.SharedMemory(name=f"{self.name}-{generation}", create=True, size=len(snapshot_bytes))
+        segment.buf[:len(snapshot_bytes)] = snapshot_bytes
+        self.segments[generation] = segment
+
+        # The swap: workers pick up the new generation on their next lookup
+        GENERATION.pack_into(self.control.buf, 0, generation)
+        self.generation = generation
+
+        for old in [g for g in self.segments if g < generation - self.keep]:
+            old_segment = self.segments.pop(old)
+            old_segment.close()
+            old_segment.unlink()
+        return generation
+
+    def publish_catalog(self, source_files, history=None):
+        """Process the source JSON files and publish the result."""
+        return self.publish(build_snapshot(build_catalog_entries(source_files, history), source_files))
+
+    def close(self):
+        """Remove every segment. Workers should be stopped first."""
+        for segment in self.segments.values():
+            segment.close()
+            segment.unlink()
+        self.segments = {}
+        self.control.close()
+        self.control.unlink()
+
+class SharedCatalog:
+    """Worker-side view of the published catalog.
+
+    The snapshot is read in place from shared memory, so every worker shares
+    one copy of the catalog however many there are.
+    """
+
+    def __init__(self, name="laptop-catalog"):
+        self.name = name
+        self.control = _attach(name)
+        self.generation = None
+        self.segment = None
+        self.snapshot = None
+
+    def current(self):
+        """Snapshot of the current generation, re-attaching if a new one was published."""
+        while True:
+            generation = GENERATION.unpack_from(self.control.buf, 0)[0]
+            if generation == 0:
+                raise LookupError(f"No catalog has been published to {self.name} yet")
+            if generation == self.generation:
+                return self.snapshot
+            try:
+                segment = _attach(f"{self.name}-{generation}")
+            except FileNotFoundError:
+                continue  # Superseded while we looked, read the generation again
+            self._release()
+            self.segment = segment
+            self.snapshot = CatalogSnapshot(segment.buf)
+            self.generation = generation
+
+    def _release(self):
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.segment.close()
+        self.snapshot = None
+        self.segment = None
+
+    def close(self):
+        self._release()
+        self.control.close()
+
+_worker_catalog = None
+
+def _init_worker(name):
+    global _worker_catalog
+    _worker_catalog = SharedCatalog(name)
+
+def _recommend(top_n):
+    recommended = recommend_from_snapshot(_worker_catalog.current(), top_n)
+    return _worker_catalog.generation, [[product, category] for product, category in recommended]
+
+if __name__ == "__main__":
+    source_files = [results_file("flipkart_results"), results_file("amazon_results")]
+    publisher = CatalogPublisher()
+    try:
+        publisher.publish_catalog(source_files)
+        with multiprocessing.Pool(4, initializer=_init_worker, initargs=(publisher.name,)) as pool:
+            for generation, recommended in pool.map(_recommend, [3, 5, 10]):
+                print(f"Generation {generation}: {[product['name'] for product, _ in recommended]}")
+
+            # A refresh is a single publish, the workers follow on their next request
+            publisher.publish_catalog(source_files)
+            for generation, recommended in pool.map(_recommend, [3, 5, 10]):
+                print(f"Generation {generation}: {len(recommended)} recommendations")
+    finally:
+        publisher.close()
@@ -0,0 +1,78 @@
+import copy
+import os
+import random
+import zlib
+from batch_recommend import recommend_batch, recommend_for_profile
+from combine_and_recommend import load_json
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+def make_product(name, ram="16GB", price=50000, rating=4.0, **specs):
+    specifications = {
+        "processor": "intel core i5-1235u", "ram": ram, "ssd": "512GB", "display_size": "15.6 inch",
+        "gpu": "N/A", "os": "Windows 11 Home", "weight": "N/A", "battery": "N/A",
+        "refresh_rate": "N/A", "resolution": "FHD",
+    }
+    specifications.update(specs)
+    return {
+        "site": "Amazon",
+        "name": name,
+        "price": f"₹{price}",
+        "rating": f"{rating} out of 5 stars",
+        "link": f"https://www.amazon.in/dp/B0{zlib.crc32(name.encode()) % 10 ** 8:08d}",
+        "specifications": specifications,
+    }
+
+def random_catalog(rng, size):
+    models = ["Brand Model Alpha Beta Gamma", "Lenovo IdeaPad Slim 3 Intel", "HP Victus Gaming Laptop 15",
+              "ASUS Vivobook 15 Thin Light", "Dell Inspiron 3530 Laptop Core"]
+    products = []
+    for i in range(size):
+        products.append(make_product(
+            f"{rng.choice(models)} variant{i}",
+            ram=rng.choice(["8GB", "16GB", "32GB"]),
+            price=rng.randrange(30, 120) * 1000,
+            rating=rng.choice([3.5, 4.0, 4.5]),
+            processor=rng.choice(["intel core i5-1235u", "intel core i7-13620h"]),
+            ssd=rng.choice(["512GB", "1TB"]),
+            gpu=rng.choice(["N/A", "nvidia geforce rtx 3050"]),
+            weight=rng.choice(["N/A", "1.3 kg", "2.1 kg"]),
+            resolution=rng.choice(["FHD", "WUXGA OLED"]),
+        ))
+    return products
+
+def random_profiles(rng, count):
+    profiles = []
+    for _ in range(count):
+        requirements = {"max_price": rng.choice([50000, 80000, 150000])}
+        for key, values in [("processor", ["i5", "i7"]), ("ram", ["8GB", "16GB", "32GB"]), ("ssd", ["512GB", "1TB"])]:
+            if rng.random() < 0.5:
+                requirements[key] = rng.choice(values)
+        profiles.append({"requirements": requirements, "top_n": rng.choice([1, 3, 5, 10])})
+    return profiles
+
+def assert_same_as_single_profile(products, profiles, **options):
+    batch = recommend_batch(copy.deepcopy(products), profiles, **options)
+    for profile, recommended in zip(profiles, batch):
+        assert recommended == recommend_for_profile(copy.deepcopy(products), profile), profile
+
+def test_later_variant_matching_the_profile_is_kept():
+    products = [
+        make_product("Brand Model Alpha Beta Gamma variant1", ram="8GB"),
+        make_product("Brand Model Alpha Beta Gamma variant2", ram="16GB"),
+    ]
+    [recommended] = recommend_batch(products, [{"requirements": {"ram": "16GB"}}])
+    assert [product["name"] for product, _ in recommended] == ["Brand Model Alpha Beta Gamma variant2"]
+
+def test_sample_data_matches_single_profile():
+    products = load_json(os.path.join(DATA_DIR, "flipkart_results.json")) + load_json(os.path.join(DATA_DIR, "amazon_results.json"))
+    assert_same_as_single_profile(products, random_profiles(random.Random(3), 40))
+
+def test_random_catalogs_match_single_profile():
+    rng = random.Random(7)
+    for _ in range(20):
+        assert_same_as_single_profile(random_catalog(rng, 60), random_profiles(rng, 10))
+
+def test_parallel_chunks_match_single_profile():
+    rng = random.Random(11)
+    assert_same_as_single_profile(random_catalog(rng, 80), random_profiles(rng, 10), workers=2, chunk_size=16)
@@ -0,0 +1,78 @@
+import copy
+import random
+from combine_and_recommend import process_products, select_recommendations
+from incremental_recommender import IncrementalRecommender
+from product_ids import extract_product_id
+
+NAMES = ["Alpha Book 14 Intel Core", "Beta Notebook 15 Ryzen 5", "Gamma Slim 13 Intel Core", "Delta Gaming 16 RTX"]
+
+def make_listing(asin, name, price=50000, rating=4.0, gpu="N/A", weight="N/A", resolution="FHD"):
+    return {
+        "site": "Amazon",
+        "name": name,
+        "price": f"₹{price}",
+        "rating": f"{rating} out of 5 stars",
+        "link": f"https://www.amazon.in/dp/{asin}",
+        "specifications": {
+            "processor": "i5", "ram": "16GB", "ssd": "512GB", "display_size": "N/A", "gpu": gpu,
+            "os": "Windows 11 Home", "weight": weight, "battery": "N/A", "refresh_rate": "N/A",
+            "resolution": resolution,
+        },
+    }
+
+def full_recompute(listings, top_n):
+    """Product IDs combine_and_recommend would pick from the listings, in arrival order."""
+    catalog = process_products(copy.deepcopy(listings))
+    ranked = sorted(range(len(catalog)), key=lambda i: catalog[i][2], reverse=True)
+    categories = [category for _, category, _ in catalog]
+    return [extract_product_id(catalog[i][0]["link"]) for i in select_recommendations(categories, ranked, top_n)]
+
+def recommended_ids(recommender):
+    return [extract_product_id(product["link"]) for product, _ in recommender.recommendations()]
+
+def test_renamed_listing_takes_over_a_later_arrival():
+    recommender = IncrementalRecommender(top_n=1)
+    a = make_listing("B00000000A", "Alpha One", price=40000)
+    b = make_listing("B00000000B", "Beta Two", price=50000)
+    recommender.upsert(a)
+    recommender.upsert(b)
+    renamed = dict(a, name="Beta Two")
+    recommender.upsert(renamed)
+    assert recommended_ids(recommender) == full_recompute([renamed, b], 1) == ["B00000000A"]
+
+def test_events_report_changes():
+    recommender = IncrementalRecommender(top_n=1)
+    events = []
+    recommender.on_change(events.append)
+    recommender.upsert(make_listing("B00000000A", "Alpha One", price=60000))
+    recommender.upsert(make_listing("B00000000B", "Beta Two", price=40000))
+    recommender.upsert(make_listing("B00000000C", "Gamma Three", price=90000))  # Not recommended, no event
+    assert [(event["added"], event["removed"]) for event in events] == [
+        (["B00000000A"], []),
+        (["B00000000B"], ["B00000000A"]),
+    ]
+
+def test_random_updates_match_full_recompute():
+    rng = random.Random(5)
+    for top_n in [1, 2, 3, 5, 8]:
+        for _ in range(40):
+            recommender = IncrementalRecommender(top_n=top_n)
+            listings = {}  # Product ID -> listing, in arrival order
+            for _ in range(40):
+                asin = f"B0000000{rng.randrange(12):02d}"
+                if asin in listings and rng.random() < 0.25:
+                    assert recommender.remove(asin)
+                    del listings[asin]
+                else:
+                    listing = make_listing(
+                        asin,
+                        rng.choice(NAMES) + rng.choice(["", " 16GB", " 512GB SSD"]),
+                        price=rng.randrange(30, 120) * 1000,
+                        rating=rng.choice([3.5, 4.0, 4.5]),
+                        gpu=rng.choice(["N/A", "nvidia rtx 4050"]),
+                        weight=rng.choice(["N/A", "1.2 kg"]),
+                        resolution=rng.choice(["FHD", "QHD OLED"]),
+                    )
+                    recommender.upsert(listing)
+                    listings[asin] = listing
+                assert recommended_ids(recommender) == full_recompute(list(listings.values()), top_n)